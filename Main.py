@@ -1,349 +1,2900 @@
-import customtkinter as ctk
-import json
-import os
-import threading
-import time
-from datetime import datetime
-from tkinter import filedialog
-from plyer import notification
-from typing import Dict, List, Optional
-import random
-from quotes_database import QUOTES_DATABASE
-
-class QuoteService:
-    def __init__(self):
-        self.quotes = QUOTES_DATABASE
-        self._generate_tags()
-
-    def _generate_tags(self):
-        """Generate unique tags from the quotes database"""
-        self.tags = sorted(list(set(
-            tag for quote in self.quotes 
-            for tag in quote["tags"]
-        )))
-
-    def get_random_quote(self, tag: str = None) -> Optional[Dict]:
-        """Get a random quote, optionally filtered by tag"""
-        matching_quotes = [
-            q for q in self.quotes 
-            if not tag or tag in q["tags"]
-        ]
-        return random.choice(matching_quotes) if matching_quotes else None
-
-    def get_tags(self) -> List[str]:
-        """Get all available tags"""
-        return self.tags
-
-    def search_quotes(self, query: str) -> List[Dict]:
-        """Search quotes by content or author"""
-        query = query.lower()
-        return [
-            q for q in self.quotes
-            if query in q["content"].lower() or 
-               query in q["author"].lower() or
-               any(query in tag.lower() for tag in q["tags"])
-        ]
-
-class StorageManager:
-    def __init__(self):
-        self.data_dir = os.path.join(os.path.expanduser("~"), ".motivation_app")
-        self.favorites_file = os.path.join(self.data_dir, "favorites.json")
-        self.history_file = os.path.join(self.data_dir, "history.json")
-        self._init_storage()
-
-    def _init_storage(self):
-        os.makedirs(self.data_dir, exist_ok=True)
-        for file in [self.favorites_file, self.history_file]:
-            if not os.path.exists(file):
-                with open(file, 'w') as f:
-                    json.dump([], f)
-
-    def add_favorite(self, quote: Dict):
-        favorites = self.get_favorites()
-        if quote not in favorites:
-            favorites.append(quote)
-            with open(self.favorites_file, 'w') as f:
-                json.dump(favorites, f)
-
-    def get_favorites(self) -> List[Dict]:
-        with open(self.favorites_file, 'r') as f:
-            return json.load(f)
-
-    def add_to_history(self, quote: Dict):
-        history = self.get_history()
-        quote["viewed_at"] = datetime.now().isoformat()
-        history.append(quote)
-        with open(self.history_file, 'w') as f:
-            json.dump(history, f)
-
-    def get_history(self) -> List[Dict]:
-        with open(self.history_file, 'r') as f:
-            return json.load(f)
-
-    def export_favorites(self, filepath: str):
-        favorites = self.get_favorites()
-        with open(filepath, 'w') as f:
-            for quote in favorites:
-                f.write(f'"{quote["content"]}" - {quote["author"]}\n')
-
-class NotificationManager:
-    def __init__(self):
-        self.notification_time = datetime.strptime("09:00", "%H:%M").time()
-        self.is_running = False
-        self.thread = None
-        self.quote_service = QuoteService()
-
-    def set_notification_time(self, hour: int, minute: int):
-        self.notification_time = datetime.strptime(
-            f"{hour:02d}:{minute:02d}", 
-            "%H:%M"
-        ).time()
-
-    def show_notification(self):
-        quote = self.quote_service.get_random_quote()
-        if quote:
-            notification.notify(
-                title="Daily Motivation",
-                message=f'"{quote["content"]}" - {quote["author"]}',
-                timeout=10
-            )
-
-    def _notification_loop(self):
-        while self.is_running:
-            now = datetime.now().time()
-            if (now.hour == self.notification_time.hour and 
-                now.minute == self.notification_time.minute):
-                self.show_notification()
-                time.sleep(60)
-            time.sleep(30)
-
-    def start_notifications(self):
-        if not self.is_running:
-            self.is_running = True
-            self.thread = threading.Thread(target=self._notification_loop)
-            self.thread.daemon = True
-            self.thread.start()
-
-    def stop_notifications(self):
-        self.is_running = False
-        if self.thread:
-            self.thread.join()
-
-class MotivationApp:
-    def __init__(self):
-        self.quote_service = QuoteService()
-        self.notification_manager = NotificationManager()
-        self.storage_manager = StorageManager()
-        
-        ctk.set_appearance_mode("dark")
-        ctk.set_default_color_theme("dark-blue")
-        
-        self.window = ctk.CTk()
-        self.window.title("Daily Motivation")
-        self.window.geometry("700x400")
-        
-        self.tags = [""] + self.quote_service.get_tags()
-        self.current_quote = None
-        
-        self.setup_ui()
-
-    def setup_ui(self):
-        main_container = ctk.CTkTabview(self.window)
-        main_container.pack(pady=20, padx=20, fill="both", expand=True)
-        
-        main_container.add("Daily Quote")
-        main_container.add("Search")
-        main_container.add("Favorites")
-        main_container.add("History")
-        main_container.add("Settings")
-        
-        self.setup_daily_quote_tab(main_container.tab("Daily Quote"))
-        self.setup_search_tab(main_container.tab("Search"))
-        self.setup_favorites_tab(main_container.tab("Favorites"))
-        self.setup_history_tab(main_container.tab("History"))
-        self.setup_settings_tab(main_container.tab("Settings"))
-
-    def setup_daily_quote_tab(self, parent):
-        category_frame = ctk.CTkFrame(parent)
-        category_frame.pack(pady=10, padx=10, fill="x")
-        
-        ctk.CTkLabel(category_frame, text="Category:").pack(side="left", padx=5)
-        self.category_var = ctk.StringVar(value="")
-        category_dropdown = ctk.CTkOptionMenu(
-            category_frame,
-            values=self.tags,
-            variable=self.category_var,
-            command=lambda _: self.update_quote()
-        )
-        category_dropdown.pack(side="left", padx=5)
-        
-        quote_frame = ctk.CTkFrame(parent)
-        quote_frame.pack(pady=10, padx=10, fill="both", expand=True)
-        
-        self.quote_text = ctk.CTkTextbox(quote_frame, height=150)
-        self.quote_text.pack(pady=10, padx=10, fill="both", expand=True)
-        self.quote_text.configure(state="disabled")
-        
-        buttons_frame = ctk.CTkFrame(quote_frame)
-        buttons_frame.pack(pady=10, fill="x")
-        
-        ctk.CTkButton(
-            buttons_frame,
-            text="New Quote",
-            command=self.update_quote
-        ).pack(side="left", padx=5)
-        
-        ctk.CTkButton(
-            buttons_frame,
-            text="Add to Favorites",
-            command=self.add_to_favorites
-        ).pack(side="left", padx=5)
-
-    def setup_search_tab(self, parent):
-        search_frame = ctk.CTkFrame(parent)
-        search_frame.pack(pady=10, padx=10, fill="both", expand=True)
-        
-        search_entry = ctk.CTkEntry(search_frame, placeholder_text="Search quotes...")
-        search_entry.pack(pady=10, padx=10, fill="x")
-        
-        ctk.CTkButton(
-            search_frame,
-            text="Search",
-            command=lambda: self.search_quotes(search_entry.get())
-        ).pack(pady=5)
-        
-        self.search_results = ctk.CTkTextbox(search_frame)
-        self.search_results.pack(pady=10, padx=10, fill="both", expand=True)
-        self.search_results.configure(state="disabled")
-
-    def setup_favorites_tab(self, parent):
-        favorites_frame = ctk.CTkFrame(parent)
-        favorites_frame.pack(pady=10, padx=10, fill="both", expand=True)
-        
-        self.favorites_text = ctk.CTkTextbox(favorites_frame)
-        self.favorites_text.pack(pady=10, padx=10, fill="both", expand=True)
-        self.favorites_text.configure(state="disabled")
-        
-        ctk.CTkButton(
-            favorites_frame,
-            text="Export Favorites",
-            command=self.export_favorites
-        ).pack(pady=10)
-        
-        self.update_favorites_display()
-
-    def setup_history_tab(self, parent):
-        history_frame = ctk.CTkFrame(parent)
-        history_frame.pack(pady=10, padx=10, fill="both", expand=True)
-        
-        self.history_text = ctk.CTkTextbox(history_frame)
-        self.history_text.pack(pady=10, padx=10, fill="both", expand=True)
-        self.history_text.configure(state="disabled")
-        
-        self.update_history_display()
-
-    def setup_settings_tab(self, parent):
-        settings_frame = ctk.CTkFrame(parent)
-        settings_frame.pack(pady=10, padx=10, fill="x")
-        
-        ctk.CTkLabel(settings_frame, text="Notification Time (24h):").pack(pady=5)
-        
-        time_entry = ctk.CTkEntry(settings_frame, placeholder_text="HH:MM")
-        time_entry.pack(pady=5)
-        
-        def set_notification():
-            try:
-                hour, minute = map(int, time_entry.get().split(":"))
-                self.notification_manager.set_notification_time(hour, minute)
-                self.notification_manager.start_notifications()
-                self.show_message("Success", "Notification time set successfully!")
-            except ValueError:
-                self.show_error("Please enter time in HH:MM format")
-        
-        ctk.CTkButton(
-            settings_frame,
-            text="Set Daily Notification",
-            command=set_notification
-        ).pack(pady=10)
-
-    def update_quote(self):
-        quote_data = self.quote_service.get_random_quote(self.category_var.get())
-        if quote_data:
-            self.current_quote = quote_data
-            self.quote_text.configure(state="normal")
-            self.quote_text.delete("1.0", "end")
-            self.quote_text.insert("1.0", f'"{quote_data["content"]}"\n\n- {quote_data["author"]}')
-            self.quote_text.configure(state="disabled")
-            self.storage_manager.add_to_history(quote_data)
-            self.update_history_display()
-        else:
-            self.show_error("Failed to fetch quote. Please try again.")
-
-    def add_to_favorites(self):
-        if self.current_quote:
-            self.storage_manager.add_favorite(self.current_quote)
-            self.update_favorites_display()
-            self.show_message("Success", "Quote added to favorites!")
-
-    def search_quotes(self, query: str):
-        results = self.quote_service.search_quotes(query)
-        self.search_results.configure(state="normal")
-        self.search_results.delete("1.0", "end")
-        if results:
-            for quote in results:
-                self.search_results.insert("end", f'"{quote["content"]}"\n- {quote["author"]}\n\n')
-        else:
-            self.search_results.insert("end", "No results found.")
-        self.search_results.configure(state="disabled")
-
-    def update_favorites_display(self):
-        favorites = self.storage_manager.get_favorites()
-        self.favorites_text.configure(state="normal")
-        self.favorites_text.delete("1.0", "end")
-        for quote in favorites:
-            self.favorites_text.insert("end", f'"{quote["content"]}"\n- {quote["author"]}\n\n')
-        self.favorites_text.configure(state="disabled")
-
-    def update_history_display(self):
-        history = self.storage_manager.get_history()
-        self.history_text.configure(state="normal")
-        self.history_text.delete("1.0", "end")
-        for quote in history:
-            viewed_at = datetime.fromisoformat(quote["viewed_at"]).strftime("%Y-%m-%d %H:%M")
-            self.history_text.insert("end", f'[{viewed_at}]\n"{quote["content"]}"\n- {quote["author"]}\n\n')
-        self.history_text.configure(state="disabled")
-
-    def export_favorites(self):
-        filepath = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Text files", "*.txt")],
-            title="Export Favorites"
-        )
-        if filepath:
-            self.storage_manager.export_favorites(filepath)
-            self.show_message("Success", "Favorites exported successfully!")
-
-    def show_error(self, message: str):
-        self.show_message("Error", message)
-
-    def show_message(self, title: str, message: str):
-        dialog = ctk.CTkToplevel(self.window)
-        dialog.title(title)
-        dialog.geometry("300x150")
-        
-        ctk.CTkLabel(dialog, text=message).pack(pady=20)
-        ctk.CTkButton(dialog, text="OK", command=dialog.destroy).pack(pady=10)
-    
-    def run(self):
-        self.update_quote()
-        self.window.mainloop()
-        
-    def cleanup(self):
-        self.notification_manager.stop_notifications()
-
-if __name__ == "__main__":
-    app = MotivationApp()
-    try:
-        app.run()
-    finally:
-        app.cleanup()
+import customtkinter as ctk
+import bisect
+import csv
+import hashlib
+import importlib.util
+import json
+import mmap
+import operator
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from datetime import date, datetime
+from tkinter import filedialog
+from plyer import notification
+from collections import OrderedDict
+from functools import lru_cache
+from collections.abc import Mapping, Sequence
+from itertools import chain, count, groupby, islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import heapq
+import math
+import random
+import re
+import sys
+import unicodedata
+import weakref
+from array import array
+
+TOKEN_PATTERN = re.compile(r"\w+")
+APOSTROPHES = str.maketrans("", "", "'\u2018\u2019\u02bc")
+STEM_SUFFIXES = ("ing", "edly", "ed", "ies", "es", "ly", "s")
+
+def fold_text(text: str) -> str:
+    """Casefold, strip accents and drop apostrophes so "Don’t" and "dont" match"""
+    folded = unicodedata.normalize("NFKD", text.casefold())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return folded.translate(APOSTROPHES)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into folded word tokens"""
+    return TOKEN_PATTERN.findall(fold_text(text))
+
+def light_stem(token: str) -> str:
+    """Strip one common English suffix, keeping at least a three-letter stem"""
+    for suffix in STEM_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == "ies":
+                return token[:-3] + "y"
+            if suffix == "s" and token.endswith("ss"):
+                return token
+            return token[:-len(suffix)]
+    return token
+
+AUTHOR_ALIASES = {
+    "anon": "unknown",
+    "anonymous": "unknown",
+    "unknown author": "unknown",
+}
+
+def fold_name(name: str) -> str:
+    """Folded name with punctuation dropped"""
+    return " ".join(tokenize(name))
+
+def normalize_author(name: str) -> str:
+    """Author index key: the folded name with known aliases merged"""
+    key = fold_name(name)
+    return AUTHOR_ALIASES.get(key, key)
+
+QUERY_TERM_PATTERN = re.compile(r'(-?)(?:(author|tag):)?(?:"([^"]*)"(?:~(\d+))?|(\S+))', re.IGNORECASE)
+
+class QueryClause:
+    """One operator of a parsed search query"""
+    __slots__ = ("kind", "value", "negated", "slop")
+
+    def __init__(self, kind: str, value: str, negated: bool = False, slop: int = 0):
+        self.kind = kind
+        self.value = value
+        self.negated = negated
+        self.slop = slop
+
+    def __str__(self) -> str:
+        value = f'"{self.value}"' if " " in self.value or self.kind == "phrase" else self.value
+        prefix = f"{self.kind}:" if self.kind in ("author", "tag") else ""
+        suffix = f"~{self.slop}" if self.slop else ""
+        return f"{'-' if self.negated else ''}{prefix}{value}{suffix}"
+
+def parse_query(query: str) -> List[List[QueryClause]]:
+    """Parse `author:X tag:Y "a phrase" "near words"~3 -word OR ...` into OR-ed
+    groups of AND-ed clauses"""
+    groups: List[List[QueryClause]] = [[]]
+    for match in QUERY_TERM_PATTERN.finditer(query):
+        negated, field, phrase, slop, word = match.groups()
+        if word == "OR" and not negated and not field:
+            groups.append([])
+            continue
+        if field:
+            kind = field.lower()
+        else:
+            kind = "phrase" if phrase is not None else "term"
+        value = phrase if phrase is not None else word
+        if value:
+            groups[-1].append(QueryClause(kind, value, bool(negated), int(slop or 0)))
+    return [group for group in groups if group]
+
+BYTE_POPCOUNT = bytes(bin(i).count("1") for i in range(256))
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of an already-lowercased string"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+@lru_cache(maxsize=65536)
+def word_trigrams(word: str) -> frozenset:
+    return frozenset(trigrams(word))
+
+class Quote(Mapping):
+    """Compact quote record.
+
+    Authors and tags are interned and tags are kept as a tuple, so a large
+    corpus shares one copy of every repeated string. The record still reads
+    like the dicts in QUOTES_DATABASE (quote["content"], dict(quote), ...).
+    """
+    __slots__ = ("id", "content", "author", "tags")
+    FIELDS = ("content", "author", "tags", "_id")
+
+    def __init__(self, id: int, content: str, author: str, tags):
+        self.id = id
+        self.content = content
+        self.author = sys.intern(author)
+        self.tags = tuple(sys.intern(tag) for tag in tags)
+
+    @classmethod
+    def from_dict(cls, data) -> "Quote":
+        if isinstance(data, Quote):
+            return data
+        return cls(int(data["_id"]), data["content"], data["author"], data["tags"])
+
+    def __getitem__(self, key: str):
+        if key == "content":
+            return self.content
+        if key == "author":
+            return self.author
+        if key == "tags":
+            return list(self.tags)
+        if key == "_id":
+            return str(self.id)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Quote(id={self.id}, author={self.author!r}, content={self.content!r})"
+
+class ColumnarCorpus(Sequence):
+    """Array-backed quote storage for very large corpora.
+
+    Content lives in one UTF-8 buffer addressed by an offsets array, authors
+    are ids into an author table and tags are stored CSR-style (a flat tag-id
+    array plus per-quote offsets). Quote records are materialized on access.
+    """
+
+    def __init__(self, quotes=()):
+        self._text = bytearray()
+        self._text_offsets = array("Q", [0])
+        self._ids = array("q")
+        self._author_ids = array("I")
+        self._tag_ids = array("I")
+        self._tag_offsets = array("Q", [0])
+        self.authors: List[str] = []
+        self.tag_names: List[str] = []
+        self._author_lookup: Dict[str, int] = {}
+        self._tag_lookup: Dict[str, int] = {}
+        for quote in quotes:
+            self.append(quote)
+
+    @staticmethod
+    def _intern_id(value: str, table: List[str], lookup: Dict[str, int]) -> int:
+        if value not in lookup:
+            lookup[value] = len(table)
+            table.append(sys.intern(value))
+        return lookup[value]
+
+    @classmethod
+    def from_buffers(cls, columns: Dict[str, Sequence], authors: List[str],
+                     tag_names: List[str]) -> "ColumnarCorpus":
+        """Wrap existing column buffers (e.g. memoryviews over an mmap) without copying"""
+        corpus = cls()
+        corpus._text = columns["text"]
+        corpus._text_offsets = columns["text_offsets"]
+        corpus._ids = columns["ids"]
+        corpus._author_ids = columns["author_ids"]
+        corpus._tag_ids = columns["tag_ids"]
+        corpus._tag_offsets = columns["tag_offsets"]
+        corpus.authors = [sys.intern(author) for author in authors]
+        corpus.tag_names = [sys.intern(tag) for tag in tag_names]
+        corpus._author_lookup = {author: i for i, author in enumerate(corpus.authors)}
+        corpus._tag_lookup = {tag: i for i, tag in enumerate(corpus.tag_names)}
+        return corpus
+
+    def columns(self) -> Dict[str, Sequence]:
+        return {
+            "text": self._text,
+            "text_offsets": self._text_offsets,
+            "ids": self._ids,
+            "author_ids": self._author_ids,
+            "tag_ids": self._tag_ids,
+            "tag_offsets": self._tag_offsets,
+        }
+
+    @property
+    def mapped(self) -> bool:
+        """True while the columns are read-only views, e.g. over a compiled file"""
+        return not isinstance(self._text, bytearray)
+
+    def ids(self) -> Sequence[int]:
+        """The id column, read without building Quote records"""
+        return self._ids
+
+    def _make_writable(self):
+        """Copy read-only (memory-mapped) columns into growable arrays before appending"""
+        if isinstance(self._text, bytearray):
+            return
+        self._text = bytearray(self._text)
+        self._text_offsets = array("Q", self._text_offsets)
+        self._ids = array("q", self._ids)
+        self._author_ids = array("I", self._author_ids)
+        self._tag_ids = array("I", self._tag_ids)
+        self._tag_offsets = array("Q", self._tag_offsets)
+
+    def append(self, quote: Quote):
+        self._make_writable()
+        self._text += quote.content.encode("utf-8")
+        self._text_offsets.append(len(self._text))
+        self._ids.append(quote.id)
+        self._author_ids.append(self._intern_id(quote.author, self.authors, self._author_lookup))
+        for tag in quote.tags:
+            self._tag_ids.append(self._intern_id(tag, self.tag_names, self._tag_lookup))
+        self._tag_offsets.append(len(self._tag_ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, position: int) -> Quote:
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        content = self._text[self._text_offsets[position]:self._text_offsets[position + 1]]
+        tag_ids = self._tag_ids[self._tag_offsets[position]:self._tag_offsets[position + 1]]
+        return Quote(
+            self._ids[position],
+            str(content, "utf-8"),
+            self.authors[self._author_ids[position]],
+            [self.tag_names[tag_id] for tag_id in tag_ids]
+        )
+
+CORPUS_MAGIC = b"DMQC"
+CORPUS_FORMAT_VERSION = 2
+CORPUS_HEADER = struct.Struct("<4sIQQ")
+CORPUS_COLUMN_TYPES = {
+    "text": "B",
+    "text_offsets": "Q",
+    "ids": "q",
+    "author_ids": "I",
+    "tag_ids": "I",
+    "tag_offsets": "Q",
+    "tag_postings": "Q",
+    "tag_posting_offsets": "Q",
+    "doc_lengths": "d",
+}
+
+COMPILED_CORPUS_FILE = os.path.join(os.path.expanduser("~"), ".motivation_app", "quotes.dmqc")
+
+def load_builtin_quotes() -> List[Dict]:
+    """The built-in QUOTES_DATABASE, imported on first use since parsing the literal is slow"""
+    from quotes_database import QUOTES_DATABASE
+    return QUOTES_DATABASE
+
+def read_quote_source(path: str, on_error: Optional[Callable[[int, str], None]] = None) -> Iterator[Dict]:
+    """Yield quote dicts from a .jsonl file or a .csv file with ';'-separated tags.
+
+    Malformed JSON lines raise, unless `on_error(line_number, message)` is
+    given, in which case they are reported and skipped.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                tags = row.get("tags") or ""
+                row["tags"] = [tag.strip() for tag in tags.split(";") if tag.strip()]
+                yield row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    if on_error is None:
+                        raise
+                    on_error(line_number, f"invalid JSON: {e}")
+
+def validate_quote_record(record) -> Optional[str]:
+    """Why a raw record does not fit the content/author/tags/_id schema, or None"""
+    if not isinstance(record, dict):
+        return "record is not an object"
+    for field in ("content", "author"):
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            return f"missing or empty {field}"
+    tags = record.get("tags")
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        return "tags must be a list of strings"
+    try:
+        int(record.get("_id"))
+    except (TypeError, ValueError):
+        return "_id must be an integer"
+    return None
+
+def compile_corpus(quotes, path: str):
+    """Write quotes with prebuilt tag and search indexes to a versioned binary corpus file.
+
+    Layout: fixed header (magic, format version, metadata offset and
+    length), the raw column arrays, each 8-byte aligned so they can be
+    mapped in place, the token, trigram and positional indexes as embedded
+    IndexSegments, and a JSON metadata block (author and tag tables, column
+    and segment locations, and the STEMMING and FIELD_BOOSTS settings the
+    indexes were built with).
+    """
+    corpus = ColumnarCorpus(Quote.from_dict(quote) for quote in quotes)
+    postings: List[List[int]] = [[] for _ in corpus.tag_names]
+    for position in range(len(corpus)):
+        start, end = corpus._tag_offsets[position], corpus._tag_offsets[position + 1]
+        for tag_id in set(corpus._tag_ids[start:end]):
+            postings[tag_id].append(position)
+    columns = dict(corpus.columns())
+    columns["tag_postings"] = array("Q", (p for posting in postings for p in posting))
+    columns["tag_posting_offsets"] = array("Q", [0])
+    for posting in postings:
+        columns["tag_posting_offsets"].append(columns["tag_posting_offsets"][-1] + len(posting))
+    indexer = QuoteService(quotes=corpus)
+    indexer._ensure_search_index()
+    columns["doc_lengths"] = array("d", indexer._doc_lengths)
+
+    with open(path, "wb") as f:
+        f.write(b"\0" * CORPUS_HEADER.size)
+        sections = {}
+        for name in CORPUS_COLUMN_TYPES:
+            data = memoryview(columns[name]).cast("B")
+            f.write(b"\0" * (-f.tell() % 8))
+            sections[name] = [f.tell(), len(data)]
+            f.write(data)
+        segments = {}
+        for index in (indexer._token_index, indexer._trigram_index, indexer._word_positions):
+            f.write(b"\0" * (-f.tell() % 8))
+            segments[index.name] = IndexSegment.write_to(f, index.kind, sorted(index.items()))
+        metadata = json.dumps({
+            "byteorder": sys.byteorder,
+            "count": len(corpus),
+            "authors": corpus.authors,
+            "tag_names": corpus.tag_names,
+            "sections": sections,
+            "index": {
+                "segments": segments,
+                "total_length": indexer._total_length,
+                "stemming": QuoteService.STEMMING,
+                "field_boosts": QuoteService.FIELD_BOOSTS,
+            },
+        }).encode("utf-8")
+        metadata_offset = f.tell()
+        f.write(metadata)
+        f.seek(0)
+        f.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_FORMAT_VERSION, metadata_offset, len(metadata)))
+
+def map_compiled_corpus(path: str) -> Tuple[Dict, Dict[str, memoryview]]:
+    """Memory-map a compiled corpus file: its metadata and its typed column views"""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, metadata_offset, metadata_length = CORPUS_HEADER.unpack_from(mapped)
+    if magic != CORPUS_MAGIC:
+        raise ValueError(f"{path} is not a compiled quote corpus")
+    if version != CORPUS_FORMAT_VERSION:
+        raise ValueError(f"Unsupported corpus format version {version} in {path}")
+    metadata = json.loads(mapped[metadata_offset:metadata_offset + metadata_length])
+    if metadata["byteorder"] != sys.byteorder:
+        raise ValueError(f"{path} was compiled on a {metadata['byteorder']}-endian machine")
+
+    view = memoryview(mapped)
+    columns = {}
+    for name, typecode in CORPUS_COLUMN_TYPES.items():
+        start, size = metadata["sections"][name]
+        columns[name] = view[start:start + size].cast(typecode)
+    return metadata, columns
+
+def load_compiled_corpus(path: str):
+    """Memory-map a compiled corpus file.
+
+    Returns the ColumnarCorpus and its tag index; quote text is paged in by
+    the OS only when a quote is actually read.
+    """
+    metadata, columns = map_compiled_corpus(path)
+    corpus = ColumnarCorpus.from_buffers(columns, metadata["authors"], metadata["tag_names"])
+    offsets = columns["tag_posting_offsets"]
+    tag_index = {
+        tag: columns["tag_postings"][offsets[tag_id]:offsets[tag_id + 1]]
+        for tag_id, tag in enumerate(corpus.tag_names)
+    }
+    return corpus, tag_index
+
+def compiled_builtin_corpus(path: str = COMPILED_CORPUS_FILE) -> Optional[str]:
+    """`path` if it holds a compiled corpus at least as new as quotes_database.py, else None"""
+    try:
+        with open(path, "rb") as f:
+            magic, version, _, _ = CORPUS_HEADER.unpack(f.read(CORPUS_HEADER.size))
+        compiled_at = os.path.getmtime(path)
+    except (OSError, struct.error):
+        return None
+    if magic != CORPUS_MAGIC or version != CORPUS_FORMAT_VERSION:
+        return None
+    spec = importlib.util.find_spec("quotes_database")
+    if spec and spec.origin and os.path.getmtime(spec.origin) > compiled_at:
+        return None
+    return path
+
+def compile_builtin_corpus(path: str = COMPILED_CORPUS_FILE):
+    """Compile QUOTES_DATABASE to `path` so later launches can map it instead"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".tmp"
+    compile_corpus(load_builtin_quotes(), temporary)
+    os.replace(temporary, path)
+
+class MergedCorpus(Sequence):
+    """Read-only concatenation of several quote sequences plus an appendable tail.
+
+    Parts are referenced, never copied; a position is resolved to its part
+    by bisecting the parts' start offsets.
+    """
+    def __init__(self, parts=()):
+        self._parts: List[Sequence] = []
+        self._starts: List[int] = []
+        self._length = 0
+        self._tail: Optional[List[Quote]] = None
+        for part in parts:
+            self.add_part(part)
+
+    def add_part(self, part: Sequence) -> int:
+        """Append a whole sequence; returns the position of its first quote"""
+        start = self._length
+        self._parts.append(part)
+        self._starts.append(start)
+        self._length += len(part)
+        self._tail = None
+        return start
+
+    def append(self, quote: Quote):
+        if self._tail is None:
+            self.add_part([])
+            self._tail = self._parts[-1]
+        self._tail.append(quote)
+        self._length += 1
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position: int) -> Quote:
+        if position < 0:
+            position += self._length
+        if not 0 <= position < self._length:
+            raise IndexError(position)
+        part = bisect.bisect_right(self._starts, position) - 1
+        return self._parts[part][position - self._starts[part]]
+
+    def ids(self) -> Iterator[int]:
+        return chain.from_iterable(corpus_ids(part) for part in self._parts)
+
+def corpus_ids(quotes: Sequence) -> Iterable[int]:
+    """Quote ids in corpus order; columnar corpora answer from their id column"""
+    if isinstance(quotes, (ColumnarCorpus, MergedCorpus)):
+        return quotes.ids()
+    return (quote.id for quote in quotes)
+
+class FoldedFields:
+    """Folded (content, author, tags) of every quote, folded on access
+    instead of held for the whole corpus. Entries that are set (blanked for
+    a removed quote, or appended) are stored."""
+    def __init__(self, quotes: Sequence):
+        self._quotes = quotes
+        self._length = len(quotes)
+        self._stored: Dict[int, Tuple[str, str, Tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, position: int) -> Tuple[str, str, Tuple[str, ...]]:
+        folded = self._stored.get(position)
+        if folded is None:
+            quote = self._quotes[position]
+            folded = (fold_text(quote.content), fold_text(quote.author),
+                      tuple(fold_text(tag) for tag in quote.tags))
+        return folded
+
+    def __setitem__(self, position: int, folded: Tuple[str, str, Tuple[str, ...]]):
+        self._stored[position] = folded
+
+    def append(self, folded: Tuple[str, str, Tuple[str, ...]]):
+        self._stored[self._length] = folded
+        self._length += 1
+
+class CorpusSource:
+    """A quote pack mounted into a QuoteService at a fixed range of positions"""
+    def __init__(self, name: str, quotes: Sequence, start: int):
+        self.name = name
+        self.quotes = quotes
+        self.start = start
+        self.enabled = True
+        # Records skipped as invalid when the pack was opened, and a sample of why
+        self.invalid = 0
+        self.errors: List[str] = []
+        self._id_offsets: Optional[Dict[int, int]] = None
+
+    @property
+    def positions(self) -> range:
+        return range(self.start, self.start + len(self.quotes))
+
+    def position_of(self, quote_id: int) -> Optional[int]:
+        """Service position of the pack's first quote with `quote_id`, if any"""
+        if self._id_offsets is None:
+            self._id_offsets = {}
+            for offset, pack_id in enumerate(corpus_ids(self.quotes)):
+                self._id_offsets.setdefault(pack_id, offset)
+        offset = self._id_offsets.get(quote_id)
+        return None if offset is None else self.start + offset
+
+def open_quote_source(source, on_error: Optional[Callable[[str], None]] = None) -> Sequence:
+    """Quotes of a pack: a compiled corpus file (mapped), a .jsonl/.csv file, or a sequence.
+
+    Records from a file or a sequence of dicts are checked with
+    validate_quote_record; invalid ones and malformed JSON lines are skipped
+    and described to `on_error`, if given.
+    """
+    prefix = f"{source} " if isinstance(source, str) else ""
+
+    def reject(location: str, message: str):
+        if on_error is not None:
+            on_error(f"{prefix}{location}: {message}")
+
+    if isinstance(source, str):
+        if not source.endswith((".jsonl", ".csv")):
+            return load_compiled_corpus(source)[0]
+        records = read_quote_source(source, on_error=lambda line, message: reject(f"line {line}", message))
+    elif isinstance(source, Sequence) and all(isinstance(quote, Quote) for quote in source):
+        return source
+    else:
+        records = source
+    quotes = []
+    for record_number, record in enumerate(records, 1):
+        error = None if isinstance(record, Quote) else validate_quote_record(record)
+        if error:
+            reject(f"record {record_number}", error)
+            continue
+        quotes.append(Quote.from_dict(record))
+    return quotes
+
+class AliasTable:
+    """Walker's alias table: O(n) to build, O(1) per weighted draw"""
+    __slots__ = ("probabilities", "aliases")
+
+    def __init__(self, weights: Sequence[float]):
+        count = len(weights)
+        total = sum(weights)
+        if not count or total <= 0:
+            raise ValueError("AliasTable needs at least one positive weight")
+        scaled = [weight * count / total for weight in weights]
+        self.probabilities = [1.0] * count
+        self.aliases = list(range(count))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            low, high = small.pop(), large.pop()
+            self.probabilities[low] = scaled[low]
+            self.aliases[low] = high
+            scaled[high] += scaled[low] - 1.0
+            (small if scaled[high] < 1.0 else large).append(high)
+
+    def sample(self, rng=random) -> int:
+        index = int(rng.random() * len(self.probabilities))
+        return index if rng.random() < self.probabilities[index] else self.aliases[index]
+
+class BlockedAliasTable:
+    """Weighted sampler made of one alias table per BLOCK_SIZE weights plus
+    one over the block totals, so changing or appending a weight rebuilds
+    only its block and the top level (on the next draw), not the whole table"""
+    BLOCK_SIZE = 1024
+
+    def __init__(self, weights: Iterable[float] = ()):
+        self.weights = array("d")
+        self._blocks: List[Optional[AliasTable]] = []
+        self._totals = array("d")
+        self._top: Optional[AliasTable] = None
+        self._dirty: Set[int] = set()
+        self.extend(weights)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def __setitem__(self, index: int, weight: float):
+        self.weights[index] = weight
+        self._dirty.add(index // self.BLOCK_SIZE)
+
+    def extend(self, weights: Iterable[float]):
+        start = len(self.weights)
+        self.weights.extend(weights)
+        self._dirty.update(range(start // self.BLOCK_SIZE, -(-len(self.weights) // self.BLOCK_SIZE)))
+
+    def _rebuild(self):
+        for block in self._dirty:
+            while len(self._blocks) <= block:
+                self._blocks.append(None)
+                self._totals.append(0.0)
+            weights = self.weights[block * self.BLOCK_SIZE:(block + 1) * self.BLOCK_SIZE]
+            total = sum(weights)
+            self._blocks[block] = AliasTable(weights) if total > 0 else None
+            self._totals[block] = total
+        self._dirty.clear()
+        self._top = AliasTable(self._totals) if sum(self._totals) > 0 else None
+
+    def sample(self, rng=random) -> Optional[int]:
+        """A weighted random index, or None when every weight is zero"""
+        if self._dirty:
+            self._rebuild()
+        if self._top is None:
+            return None
+        block = self._top.sample(rng)
+        return block * self.BLOCK_SIZE + self._blocks[block].sample(rng)
+
+class ShuffleCursor:
+    """Walks a keyed pseudo-random permutation of range(size) without storing it.
+
+    The permutation is a small Feistel network over the next even power of
+    two, cycle-walked back into range, so the whole state is (seed, position).
+    Once every index has been returned a new round starts with a fresh seed.
+    """
+    ROUNDS = 4
+
+    def __init__(self, size: int, seed: Optional[int] = None, position: int = 0):
+        self.size = size
+        self.seed = random.getrandbits(64) if seed is None else seed
+        self.position = position
+        self._half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        self._mask = (1 << self._half_bits) - 1
+
+    def _round(self, value: int, round_number: int) -> int:
+        data = f"{self.seed}:{round_number}:{value}".encode()
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little") & self._mask
+
+    def permute(self, index: int) -> int:
+        value = index
+        while True:
+            left, right = value >> self._half_bits, value & self._mask
+            for round_number in range(self.ROUNDS):
+                left, right = right, left ^ self._round(right, round_number)
+            value = (left << self._half_bits) | right
+            if value < self.size:
+                return value
+
+    def next(self) -> int:
+        if self.position >= self.size:
+            self.seed = random.getrandbits(64)
+            self.position = 0
+        index = self.permute(self.position)
+        self.position += 1
+        return index
+
+    def to_dict(self) -> Dict[str, int]:
+        return {"seed": self.seed, "position": self.position, "size": self.size}
+
+    @classmethod
+    def from_dict(cls, state: Dict, size: int) -> "ShuffleCursor":
+        """Resume a saved cursor; a pool that changed size starts a new round"""
+        if state.get("size") != size:
+            return cls(size)
+        return cls(size, state["seed"], state["position"])
+
+class PrefixCompleter:
+    """Sorted-array prefix completion, best suggestions by frequency first"""
+    CACHE_SIZE = 4096
+
+    def __init__(self, frequencies: Dict[str, int]):
+        entries = sorted((fold_name(term), term, count) for term, count in frequencies.items())
+        self._keys = [key for key, _, _ in entries]
+        self._terms = [term for _, term, _ in entries]
+        self._counts = [count for _, _, count in entries]
+        self._cache: Dict[tuple, List[str]] = {}
+
+    def complete(self, prefix: str, limit: int = 8) -> List[str]:
+        key = fold_name(prefix)
+        if not key:
+            return []
+        if (key, limit) not in self._cache:
+            if len(self._cache) >= self.CACHE_SIZE:
+                self._cache.clear()
+            start = bisect.bisect_left(self._keys, key)
+            end = bisect.bisect_left(self._keys, key + "\uffff", start)
+            best = heapq.nlargest(limit, range(start, end), key=self._counts.__getitem__)
+            self._cache[key, limit] = [self._terms[i] for i in best]
+        return self._cache[key, limit]
+
+class NearDuplicateDetector:
+    """MinHash signatures over character shingles, bucketed with LSH banding.
+
+    Quotes whose estimated Jaccard similarity reaches `threshold` are grouped
+    into clusters. Only quotes sharing an LSH bucket are compared, so finding
+    duplicates is roughly linear in corpus size.
+    """
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        # XOR with a random mask permutes 64-bit hashes; map() keeps the min loop in C
+        self._masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+    def _shingles(self, text: str) -> Set[str]:
+        text = " ".join(tokenize(text))
+        if len(text) <= self.shingle_size:
+            return {text}
+        return {text[i:i + self.shingle_size] for i in range(len(text) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Sequence[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+            for shingle in self._shingles(text)
+        ]
+        return array("Q", (min(map(mask.__xor__, hashes)) for mask in self._masks))
+
+    def similarity(self, first: Sequence[int], second: Sequence[int]) -> float:
+        return sum(map(operator.eq, first, second)) / self.num_perm
+
+    def clusters(self, quotes) -> List[List[int]]:
+        """Groups of positions (two or more) whose quotes are near-duplicates"""
+        return self.clusters_of([self.signature(quote.content) for quote in quotes])
+
+    def clusters_of(self, signatures: Sequence[Sequence[int]]) -> List[List[int]]:
+        """clusters() over precomputed signatures"""
+        rows = self.num_perm // self.bands
+        parents = list(range(len(signatures)))
+
+        def find(position: int) -> int:
+            while parents[position] != position:
+                parents[position] = parents[parents[position]]
+                position = parents[position]
+            return position
+
+        compared: Set[Tuple[int, int]] = set()
+        for band in range(self.bands):
+            buckets: Dict[Tuple[int, ...], List[int]] = {}
+            for position, signature in enumerate(signatures):
+                buckets.setdefault(tuple(signature[band * rows:(band + 1) * rows]), []).append(position)
+            for members in buckets.values():
+                # Each member is compared with one representative per cluster
+                # in the bucket (not just the first member, since similarity is
+                # not transitive, and not every member, which is quadratic on
+                # clusters of near-identical variants). Pairs compared in an
+                # earlier band are skipped.
+                representatives: Dict[int, int] = {}
+                for member in members:
+                    if find(member) in representatives:
+                        continue
+                    for representative in list(representatives.values()):
+                        first, other = find(member), find(representative)
+                        pair = (min(member, representative), max(member, representative))
+                        if first == other or pair in compared:
+                            continue
+                        compared.add(pair)
+                        if self.similarity(signatures[member], signatures[representative]) >= self.threshold:
+                            parents[max(first, other)] = min(first, other)
+                    representatives = {find(representative): representative
+                                       for representative in representatives.values()}
+                    representatives.setdefault(find(member), member)
+
+        groups: Dict[int, List[int]] = {}
+        for position in range(len(signatures)):
+            groups.setdefault(find(position), []).append(position)
+        return [group for group in groups.values() if len(group) > 1]
+
+    def report(self, quotes) -> str:
+        """Human-readable list of near-duplicate clusters"""
+        lines = []
+        for group in self.clusters(quotes):
+            lines.append(f"{len(group)} near-duplicates:")
+            lines.extend(f'  [{quotes[position].id}] "{quotes[position].content}"' for position in group)
+        return "\n".join(lines) or "No near-duplicates found."
+
+    def collapse(self, quotes) -> list:
+        """Quotes with every near-duplicate cluster reduced to its first member"""
+        dropped = {position for group in self.clusters(quotes) for position in group[1:]}
+        return [quote for position, quote in enumerate(quotes) if position not in dropped]
+
+class SearchCache:
+    """LRU cache of search results, bounded by entry count and total cached results"""
+
+    def __init__(self, max_entries: int = 256, max_results: int = 100_000):
+        self.max_entries = max_entries
+        self.max_results = max_results
+        self._entries: "OrderedDict[tuple, List[Quote]]" = OrderedDict()
+        self._size = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, version: int) -> Optional[List[Quote]]:
+        if version != self._version:
+            self.clear()
+            self._version = version
+        results = self._entries.get(key)
+        if results is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return results
+
+    def put(self, key: tuple, version: int, results: List[Quote]):
+        if version != self._version or len(results) > self.max_results:
+            return
+        self._entries[key] = results
+        self._size += len(results)
+        while len(self._entries) > self.max_entries or self._size > self.max_results:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "cached_results": self._size,
+        }
+
+SEGMENT_MAGIC = b"DMQS"
+SEGMENT_FORMAT_VERSION = 2
+SEGMENT_HEADER = struct.Struct("<4sIQQ")
+SEGMENT_COLUMN_TYPES = {
+    "positions": "q",
+    "posting_offsets": "Q",
+    "weights": "d",
+    "values": "I",
+    "value_offsets": "Q",
+}
+
+class IndexSegment:
+    """An immutable on-disk run of one inverted index.
+
+    Layout: fixed header (magic, format version, metadata offset and
+    length), the raw column arrays, each 8-byte aligned, then a JSON
+    metadata block with the sorted keys and column locations. Postings are
+    CSR-style: every key's sorted positions concatenated, with per-key
+    offsets, plus a parallel weight column ("weights" kind) or CSR word
+    offsets ("offsets" kind). The file is mapped and a posting is read
+    straight out of the arrays when its key is looked up.
+
+    A segment can also be embedded at `offset` in a larger file (a compiled
+    corpus carries its prebuilt indexes this way); its locations are then
+    absolute in that file, and merging it away never deletes the file.
+    """
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        self.embedded = offset > 0
+        with open(path, "rb") as f:
+            self._mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, metadata_offset, metadata_length = SEGMENT_HEADER.unpack_from(self._mapped, offset)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"{path} is not an index segment")
+        if version != SEGMENT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported segment format version {version} in {path}")
+        metadata = json.loads(self._mapped[metadata_offset:metadata_offset + metadata_length])
+        self.kind = metadata["kind"]
+        self.keys: List[str] = metadata["keys"]
+        self._key_ids = {key: key_id for key_id, key in enumerate(self.keys)}
+        self.low, self.high = metadata["low"], metadata["high"]
+        self.size = metadata["size"]
+        # Positions hidden since the segment was written; dropped when it is merged
+        self.tombstones: Set[int] = set()
+        self._view = memoryview(self._mapped)
+        self._columns = {
+            name: self._view[start:start + size].cast(SEGMENT_COLUMN_TYPES[name])
+            for name, (start, size) in metadata["sections"].items()
+        }
+
+    def close(self):
+        """Unmap the file; required before it can be deleted on Windows"""
+        if self._mapped.closed:
+            return
+        for column in self._columns.values():
+            column.release()
+        self._view.release()
+        self._mapped.close()
+
+    @classmethod
+    def write(cls, path: str, kind: str, postings) -> "IndexSegment":
+        """Write (key, posting) pairs, in key order, to a new segment file"""
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            cls.write_to(f, kind, postings)
+        os.replace(temporary, path)
+        return cls(path)
+
+    @staticmethod
+    def write_to(f, kind: str, postings) -> int:
+        """Write a segment at the current position of `f`, which must be
+        8-byte aligned, and return that position"""
+        keys: List[str] = []
+        positions, posting_offsets = array("q"), array("Q", [0])
+        columns = {"positions": positions, "posting_offsets": posting_offsets}
+        if kind == "weights":
+            weights = columns["weights"] = array("d")
+        elif kind == "offsets":
+            values = columns["values"] = array("I")
+            value_offsets = columns["value_offsets"] = array("Q", [0])
+        for key, posting in postings:
+            keys.append(key)
+            ordered = sorted(posting)
+            positions.extend(ordered)
+            posting_offsets.append(len(positions))
+            if kind == "weights":
+                weights.extend(posting[position] for position in ordered)
+            elif kind == "offsets":
+                for position in ordered:
+                    values.extend(posting[position])
+                    value_offsets.append(len(values))
+        start = f.tell()
+        f.write(b"\0" * SEGMENT_HEADER.size)
+        sections = {}
+        for name, column in columns.items():
+            f.write(b"\0" * (-f.tell() % 8))
+            sections[name] = (f.tell(), len(column) * column.itemsize)
+            column.tofile(f)
+        metadata = json.dumps({
+            "kind": kind, "keys": keys, "sections": sections,
+            "low": min(positions, default=0), "high": max(positions, default=-1),
+            "size": len(positions),
+        }).encode("utf-8")
+        metadata_offset = f.tell()
+        f.write(metadata)
+        end = f.tell()
+        f.seek(start)
+        f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, SEGMENT_FORMAT_VERSION,
+                                    metadata_offset, len(metadata)))
+        f.seek(end)
+        return start
+
+    def covers(self, position: int) -> bool:
+        return self.low <= position <= self.high
+
+    def get(self, key: str):
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            return None
+        offsets = self._columns["posting_offsets"]
+        start, end = offsets[key_id], offsets[key_id + 1]
+        positions = self._columns["positions"][start:end]
+        if self.kind == "set":
+            return set(positions)
+        if self.kind == "weights":
+            return dict(zip(positions, self._columns["weights"][start:end]))
+        values, value_offsets = self._columns["values"], self._columns["value_offsets"]
+        return {
+            position: values[value_offsets[entry]:value_offsets[entry + 1]].tolist()
+            for entry, position in enumerate(positions, start)
+        }
+
+class SegmentedIndex(Mapping):
+    """An inverted index split LSM-style into segments.
+
+    New postings go to a small in-memory segment; flush() freezes it into
+    an immutable IndexSegment file and merge() combines files of similar
+    size (size-tiered), so each posting is rewritten O(log n) times.
+    Lookups fan out over every segment. Hidden positions are tombstoned in
+    the on-disk segments that cover them, and the postings and tombstones
+    are both dropped when those segments are merged.
+    `kind` is "set" (posting = set of positions), "weights" (position ->
+    term weight) or "offsets" (position -> list of word offsets).
+    Without a directory everything stays in the memory segment.
+    """
+    def __init__(self, name: str, kind: str, directory: Optional[str] = None):
+        self.name = name
+        self.kind = kind
+        self.segments: List[IndexSegment] = []
+        self._memory: Dict[str, object] = {}
+        self._high = -1
+        self._directory = directory
+        self._path: Optional[str] = None
+        self._open: List[IndexSegment] = []
+        self._sequence = count(1)
+        # Held while segments are read, so a merge can close the ones it replaced
+        self._lock = threading.Lock()
+        # Held for a whole merge: two merges picking the same tier would
+        # both close and delete its segments
+        self._merge_lock = threading.Lock()
+
+    def add(self, key: str, position: int, value=None):
+        posting = self._memory.get(key)
+        if posting is None:
+            posting = self._memory[key] = set() if self.kind == "set" else {}
+        if self.kind == "set":
+            posting.add(position)
+        else:
+            posting[position] = value
+        if position <= self._high:
+            with self._lock:
+                for segment in self.segments:
+                    segment.tombstones.discard(position)
+
+    def discard(self, key: str, position: int):
+        posting = self._memory.get(key)
+        if posting is not None and position in posting:
+            if self.kind == "set":
+                posting.discard(position)
+            else:
+                del posting[position]
+            if not posting:
+                del self._memory[key]
+        if position <= self._high:
+            with self._lock:
+                for segment in self.segments:
+                    if segment.covers(position):
+                        segment.tombstones.add(position)
+
+    @property
+    def tombstone_count(self) -> int:
+        return sum(len(segment.tombstones) for segment in self.segments)
+
+    def _merged(self, key: str, segments: List[IndexSegment], tombstones: List[Set[int]]):
+        merged = set() if self.kind == "set" else {}
+        for segment, dropped in zip(segments, tombstones):
+            posting = segment.get(key)
+            if not posting:
+                continue
+            if dropped:
+                if self.kind == "set":
+                    posting = {position for position in posting if position not in dropped}
+                else:
+                    posting = {position: value for position, value in posting.items()
+                               if position not in dropped}
+            merged.update(posting)
+        return merged
+
+    def __getitem__(self, key: str):
+        if not self.segments:
+            return self._memory[key]
+        with self._lock:
+            segments = self.segments
+            merged = self._merged(key, segments, [segment.tombstones for segment in segments])
+        merged.update(self._memory.get(key, ()))
+        if not merged:
+            raise KeyError(key)
+        return merged
+
+    def __iter__(self) -> Iterator[str]:
+        keys = set(self._memory)
+        for segment in self.segments:
+            keys.update(segment.keys)
+        return iter(keys)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def items(self):
+        for key in self:
+            posting = self.get(key)
+            if posting:
+                yield key, posting
+
+    def attach(self, segment: IndexSegment):
+        """Serve a prebuilt segment, e.g. one embedded in a compiled corpus, as the oldest run"""
+        with self._lock:
+            self.segments = [segment] + self.segments
+            self._high = max(self._high, segment.high)
+
+    def _segment_path(self) -> str:
+        if self._path is None:
+            os.makedirs(self._directory, exist_ok=True)
+            self._path = tempfile.mkdtemp(prefix=f"{self.name}-", dir=self._directory)
+            weakref.finalize(self, self._remove_files, self._open, self._path)
+        return os.path.join(self._path, f"{next(self._sequence):06d}.seg")
+
+    @staticmethod
+    def _remove_files(segments: List[IndexSegment], path: str):
+        for segment in segments:
+            segment.close()
+        shutil.rmtree(path, True)
+
+    def flush(self):
+        """Freeze the memory segment into an on-disk segment"""
+        if not self._memory or not self._directory:
+            return
+        segment = IndexSegment.write(self._segment_path(), self.kind, sorted(self._memory.items()))
+        with self._lock:
+            self._open.append(segment)
+            # Publish the segment before emptying memory, so a concurrent
+            # lookup sees the postings twice rather than not at all
+            self.segments = self.segments + [segment]
+            self._high = max(self._high, segment.high)
+            self._memory = {}
+
+    def _merge_candidates(self, factor: int) -> List[IndexSegment]:
+        """The segments of the smallest size tier holding at least `factor` of them"""
+        tiers: Dict[int, List[IndexSegment]] = {}
+        for segment in self.segments:
+            tiers.setdefault(int(math.log(max(segment.size, 1), factor)), []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= factor:
+                return tiers[tier]
+        return []
+
+    def needs_merge(self, factor: int) -> bool:
+        return bool(self._merge_candidates(factor))
+
+    def merge(self, factor: int) -> bool:
+        """Merge one tier of similar-sized segments, k-way over their sorted keys.
+
+        Returns False when no tier holds `factor` segments yet. Concurrent
+        calls (e.g. from a service that adopted this index while its loader
+        was still merging) run one after the other.
+        """
+        with self._merge_lock:
+            segments = self._merge_candidates(factor)
+            if not segments:
+                return False
+            with self._lock:
+                tombstones = [set(segment.tombstones) for segment in segments]
+            keys = groupby(heapq.merge(*(segment.keys for segment in segments)))
+            postings = ((key, self._merged(key, segments, tombstones)) for key, _ in keys)
+            merged = IndexSegment.write(self._segment_path(), self.kind,
+                                        ((key, posting) for key, posting in postings if posting))
+            with self._lock:
+                self._open.append(merged)
+                # Tombstones added while merging still apply to the merged segment
+                for segment, applied in zip(segments, tombstones):
+                    merged.tombstones |= segment.tombstones - applied
+                self.segments = [segment for segment in self.segments if segment not in segments] + [merged]
+                for segment in segments:
+                    segment.close()
+                    if segment in self._open:
+                        self._open.remove(segment)
+            for segment in segments:
+                if not segment.embedded:
+                    os.remove(segment.path)
+            return True
+
+class QuoteService:
+    FUZZY_THRESHOLD = 0.5
+    FIELD_BOOSTS = {"content": 1.0, "author": 2.0, "tags": 1.5}
+    BM25_K1 = 1.2
+    BM25_B = 0.75
+    RANKED_LIMIT = 20
+    LAZY_SAMPLE_SIZE = 50
+    # Result sets up to this size are cached by iter_search once fully read
+    CURSOR_CACHE_LIMIT = 1_000
+    STEMMING = False
+    SEGMENT_SIZE = 5_000
+    MERGE_FACTOR = 4
+    # Below this many changes a sorted posting is patched in place with
+    # bisect; above it, rebuilding the posting in one pass is cheaper
+    SORTED_PATCH_LIMIT = 64
+
+    def __init__(self, columnar: bool = False, corpus_path: Optional[str] = None,
+                 lazy: bool = False, dedupe: bool = False, index_dir: Optional[str] = None,
+                 quotes: Optional[Sequence] = None):
+        """Load the corpus and build the tag index.
+
+        The corpus is the built-in database, `quotes` (quote dicts or Quote
+        records) if given, or the compiled corpus file at corpus_path, whose
+        prebuilt search indexes are mapped along with it.
+
+        dedupe=True collapses near-duplicate quotes (see NearDuplicateDetector)
+        before anything is indexed: of the built-in database, of a compiled
+        corpus and, by default, of packs mounted later.
+
+        With lazy=True the constructor returns immediately: the first
+        LAZY_SAMPLE_SIZE quotes of the built-in database or compiled corpus
+        are served while the full corpus and search indexes are built by a
+        second service on a background thread and then adopted, so searches
+        never wait for the build. `ready` is set once that finishes.
+
+        With index_dir set, the token, trigram and positional indexes are
+        segmented: every SEGMENT_SIZE newly indexed quotes are flushed to
+        immutable files under index_dir. Whenever MERGE_FACTOR files of a
+        similar size pile up they are merged in the background (see
+        SegmentedIndex).
+        """
+        self.version = 0
+        self.corpus_path = corpus_path
+        self.index_dir = index_dir
+        self.dedupe = dedupe
+        # MinHash signatures by position, so deduping a mounted pack only signs the pack
+        self._signatures: Dict[int, Sequence[int]] = {}
+        self._merge_lock = threading.Lock()
+        self.search_cache = SearchCache()
+        self._completer: Optional[PrefixCompleter] = None
+        self._completer_version = None
+        self._completer_thread: Optional[threading.Thread] = None
+        self._tags_by_folded: Dict[str, List[str]] = {}
+        self._tags_by_folded_version = None
+        self._weights: Dict[int, float] = {}
+        self._deleted: Set[int] = set()
+        self._deleted_mask = 0
+        self._removed: Set[int] = set()
+        self.sources: Dict[str, CorpusSource] = {}
+        self.ready = threading.Event()
+        self._index_lock = threading.RLock()
+        if corpus_path and lazy:
+            corpus, _ = load_compiled_corpus(corpus_path)
+            self.quotes = [corpus[position] for position in range(min(len(corpus), self.LAZY_SAMPLE_SIZE))]
+            self._generate_tags()
+            self.rebuild_index()
+            if dedupe:
+                self._drop_near_duplicates(range(len(self.quotes)))
+            background = lambda: self._adopt(QuoteService(corpus_path=corpus_path, dedupe=dedupe,
+                                                          index_dir=index_dir))
+        elif corpus_path:
+            self.quotes, tag_index = load_compiled_corpus(corpus_path)
+            self.tags = sorted(tag_index)
+            self._reset_index(tag_index)
+            self._attach_compiled_index(corpus_path)
+            if dedupe:
+                self._drop_near_duplicates(range(len(self.quotes)))
+            background = None
+        elif lazy:
+            source = load_builtin_quotes() if quotes is None else quotes
+            sample = [Quote.from_dict(quote) for quote in islice(source, self.LAZY_SAMPLE_SIZE)]
+            self.quotes = NearDuplicateDetector().collapse(sample) if dedupe else sample
+            self._generate_tags()
+            self.rebuild_index()
+            background = lambda: self._adopt(QuoteService(columnar=columnar, dedupe=dedupe,
+                                                          index_dir=index_dir, quotes=quotes))
+        else:
+            source = load_builtin_quotes() if quotes is None else quotes
+            quotes = [Quote.from_dict(quote) for quote in source]
+            if dedupe:
+                quotes = NearDuplicateDetector().collapse(quotes)
+            self.quotes = ColumnarCorpus(quotes) if columnar else quotes
+            self._generate_tags()
+            self.rebuild_index()
+            background = None
+        if lazy and background:
+            threading.Thread(target=self._load_in_background, args=(background,), daemon=True).start()
+        else:
+            self.ready.set()
+
+    def _attach_compiled_index(self, path: str):
+        """Serve the search indexes prebuilt into a compiled corpus straight
+        from the file, if they were built with this service's STEMMING and
+        FIELD_BOOSTS; otherwise they are built on first search as usual"""
+        metadata, columns = map_compiled_corpus(path)
+        index = metadata["index"]
+        if index["stemming"] != self.STEMMING or index["field_boosts"] != self.FIELD_BOOSTS:
+            return
+        for target in (self._token_index, self._trigram_index, self._word_positions):
+            target.attach(IndexSegment(path, index["segments"][target.name]))
+        self._doc_lengths = array("d", columns["doc_lengths"])
+        self._total_length = index["total_length"]
+        self._folded = FoldedFields(self.quotes)
+        self._search_indexed = len(self.quotes)
+
+    def _load_in_background(self, load):
+        try:
+            load()
+        finally:
+            self.ready.set()
+
+    def _adopt(self, full: "QuoteService"):
+        """Swap in a fully loaded service's corpus and indexes.
+
+        The sample is a prefix of the full corpus, so positions held by an
+        in-flight search stay valid across the swap.
+        """
+        full._ensure_search_index()
+        with self._index_lock:
+            self.quotes = full.quotes
+            self.tags = full.tags
+            self._tag_index = full._tag_index
+            self._token_index = full._token_index
+            self._doc_lengths = full._doc_lengths
+            self._total_length = full._total_length
+            self._trigram_index = full._trigram_index
+            self._word_positions = full._word_positions
+            self._folded = full._folded
+            self._search_indexed = full._search_indexed
+            self._unflushed = full._unflushed
+            self._deleted = full._deleted
+            self._deleted_mask = full._deleted_mask
+            self._removed = full._removed
+            self._signatures = full._signatures
+            self._alias_tables = {}
+            self._tag_bitsets = {}
+            self._reset_author_index()
+            self._id_positions = None
+            self.version += 1
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until background loading has finished"""
+        return self.ready.wait(timeout)
+
+    def _generate_tags(self):
+        """Generate unique tags from the quotes database"""
+        self.tags = sorted(list(set(
+            tag for quote in self.quotes 
+            for tag in quote.tags
+        )))
+
+    def rebuild_index(self):
+        """Rebuild the tag index from scratch; search indexes follow on the next search"""
+        self._reset_index({})
+        for position, quote in enumerate(self.quotes):
+            if position not in self._deleted:
+                self._index_tags(position, quote)
+
+    def _reset_index(self, tag_index: Dict[str, Sequence]):
+        self.version += 1
+        self._tag_index = tag_index
+        self._token_index = SegmentedIndex("tokens", "weights", self.index_dir)
+        self._doc_lengths: List[float] = []
+        self._total_length = 0.0
+        self._trigram_index = SegmentedIndex("trigrams", "set", self.index_dir)
+        self._word_positions = SegmentedIndex("positions", "offsets", self.index_dir)
+        self._unflushed = 0
+        self._folded: Sequence[Tuple[str, str, Tuple[str, ...]]] = []
+        self._search_indexed = 0
+        self._alias_tables: Dict[str, BlockedAliasTable] = {}
+        self._tag_bitsets: Dict[str, int] = {}
+        self._reset_author_index()
+        self._id_positions: Optional[Dict[int, int]] = None
+
+    def _index_tags(self, position: int, quote: Quote):
+        for tag in set(quote.tags):
+            positions = self._tag_index[tag] = self._mutable_posting(self._tag_index.get(tag, []))
+            positions.append(position)
+
+    def _ensure_search_index(self):
+        """Index any quotes the token and trigram indexes have not seen yet"""
+        with self._index_lock:
+            while self._search_indexed < len(self.quotes):
+                position = self._search_indexed
+                if position in self._deleted:
+                    self._folded.append(("", "", ()))
+                    self._doc_lengths.append(0.0)
+                else:
+                    self._index_search_terms(position, self.quotes[position])
+                self._search_indexed += 1
+                self._flush_segments()
+
+    def _flush_segments(self):
+        """Flush the in-memory index segments once SEGMENT_SIZE quotes have gone into them"""
+        if not self.index_dir or self._unflushed < self.SEGMENT_SIZE:
+            return
+        indexes = (self._token_index, self._trigram_index, self._word_positions)
+        for index in indexes:
+            index.flush()
+        self._unflushed = 0
+        if (any(index.needs_merge(self.MERGE_FACTOR) for index in indexes)
+                and self._merge_lock.acquire(blocking=False)):
+            threading.Thread(target=self._merge_segments, args=(indexes,), daemon=True).start()
+
+    def _merge_segments(self, indexes):
+        while True:
+            try:
+                for index in indexes:
+                    while index.merge(self.MERGE_FACTOR):
+                        pass
+            finally:
+                self._merge_lock.release()
+            # Flushes made during the merge could not start one of their own
+            if not (any(index.needs_merge(self.MERGE_FACTOR) for index in indexes)
+                    and self._merge_lock.acquire(blocking=False)):
+                return
+
+    def index_stats(self) -> Dict[str, int]:
+        return {
+            "memory_quotes": self._unflushed,
+            "segments": len(self._token_index.segments),
+            "tombstones": self._token_index.tombstone_count,
+        }
+
+    def _reset_author_index(self):
+        self._author_index: Dict[str, List[int]] = {}
+        self._author_names: Dict[str, str] = {}
+        self._author_keys: Optional[List[str]] = None
+        self._author_indexed = 0
+
+    def _ensure_author_index(self):
+        """Index any quotes the author index has not seen yet"""
+        with self._index_lock:
+            while self._author_indexed < len(self.quotes):
+                position = self._author_indexed
+                self._author_indexed += 1
+                if position in self._deleted:
+                    continue
+                author = self.quotes[position].author
+                key = normalize_author(author)
+                if key not in self._author_index:
+                    self._author_names[key] = author
+                    self._author_keys = None
+                self._author_index.setdefault(key, []).append(position)
+
+    def get_quotes_by_author(self, author: str) -> List[Quote]:
+        """All quotes by an author, matched case-, accent- and alias-insensitively"""
+        self._ensure_author_index()
+        positions = self._author_index.get(normalize_author(author), ())
+        return [self.quotes[position] for position in positions]
+
+    def author_counts(self) -> Dict[str, int]:
+        """Number of quotes per author, keyed by display name"""
+        self._ensure_author_index()
+        return {
+            self._author_names[key]: len(positions)
+            for key, positions in self._author_index.items()
+        }
+
+    def complete_author(self, prefix: str, limit: int = 10) -> List[str]:
+        """Display names of authors whose normalized name starts with `prefix`"""
+        self._ensure_author_index()
+        if self._author_keys is None:
+            self._author_keys = sorted(self._author_index)
+        prefix = fold_name(prefix)
+        start = bisect.bisect_left(self._author_keys, prefix)
+        names = []
+        for key in islice(self._author_keys, start, None):
+            if not key.startswith(prefix) or len(names) >= limit:
+                break
+            names.append(self._author_names[key])
+        return names
+
+    def completer_ready(self) -> bool:
+        return self._completer is not None and self._completer_version == self.version
+
+    def warm_completer(self):
+        """Rebuild a stale completer on a background thread, unless one is already running"""
+        if self.completer_ready() or (self._completer_thread and self._completer_thread.is_alive()):
+            return
+        self._completer_thread = threading.Thread(target=self._build_completer, daemon=True)
+        self._completer_thread.start()
+
+    def _build_completer(self):
+        self._ensure_search_index()
+        with self._index_lock:
+            version = self.version
+            frequencies = {token: len(posting) for token, posting in self._token_index.items()}
+            frequencies.update(self.author_counts())
+            frequencies.update((tag, len(positions)) for tag, positions in self._tag_index.items())
+        self._completer = PrefixCompleter(frequencies)
+        self._completer_version = version
+
+    def complete(self, prefix: str, limit: int = 8, wait: bool = True) -> List[str]:
+        """Suggest words, authors and tags starting with `prefix`, most frequent first.
+
+        The completer is rebuilt from the indexes after the corpus changes.
+        With wait=False (for UI threads) the previous completer answers while
+        warm_completer() rebuilds it in the background; [] before the first build.
+        """
+        if not self.completer_ready():
+            if wait:
+                self._build_completer()
+            else:
+                self.warm_completer()
+        completer = self._completer
+        return completer.complete(prefix, limit) if completer else []
+
+    def _terms(self, text: str) -> List[str]:
+        """Index/query terms: folded tokens, stemmed when STEMMING is on"""
+        tokens = tokenize(text)
+        return [light_stem(token) for token in tokens] if self.STEMMING else tokens
+
+    def _index_search_terms(self, position: int, quote: Quote):
+        # Fields are folded once here and cached; queries are folded the same way.
+        # A hidden quote keeps its folded fields, so showing it again skips this step
+        if position == len(self._folded):
+            self._folded.append(("", "", ()))
+            self._doc_lengths.append(0.0)
+        folded = self._folded[position]
+        if not folded[0]:
+            folded = self._folded[position] = (
+                fold_text(quote.content), fold_text(quote.author),
+                tuple(fold_text(tag) for tag in quote.tags))
+        content_terms, weights, quote_trigrams = self._search_entries(folded)
+        for token, weight in weights.items():
+            self._token_index.add(token, position, weight)
+        length = sum(weights.values())
+        self._doc_lengths[position] = length
+        self._total_length += length
+        for trigram in quote_trigrams:
+            self._trigram_index.add(trigram, position)
+        offsets: Dict[str, List[int]] = {}
+        for offset, token in enumerate(content_terms):
+            offsets.setdefault(token, []).append(offset)
+        for token, token_offsets in offsets.items():
+            self._word_positions.add(token, position, token_offsets)
+        self._unflushed += 1
+
+    def _search_entries(self, folded: Tuple[str, str, Tuple[str, ...]]):
+        """Content terms, weighted terms and trigrams of a quote's folded fields"""
+        content_terms = self._terms(folded[0])
+        weights = self._term_weights(content_terms, self._terms(folded[1]),
+                                     [term for tag in folded[2] for term in self._terms(tag)])
+        quote_trigrams = trigrams(folded[0]) | trigrams(folded[1])
+        for tag in folded[2]:
+            quote_trigrams |= trigrams(tag)
+        return content_terms, weights, quote_trigrams
+
+    def _hide(self, positions: Sequence[int]):
+        """Take live quotes out of every index, touching only their own entries.
+
+        Hidden positions become tombstones so every other position stays
+        valid; tag and author postings are filtered once per affected key.
+        """
+        by_tag: Dict[str, Set[int]] = {}
+        by_author: Dict[str, Set[int]] = {}
+        id_positions = self._id_map()
+        for position in positions:
+            quote = self.quotes[position]
+            for tag in set(quote.tags):
+                by_tag.setdefault(tag, set()).add(position)
+            if position < self._search_indexed:
+                content_terms, weights, quote_trigrams = self._search_entries(self._folded[position])
+                for token in weights:
+                    self._token_index.discard(token, position)
+                for trigram in quote_trigrams:
+                    self._trigram_index.discard(trigram, position)
+                for token in set(content_terms):
+                    self._word_positions.discard(token, position)
+                self._total_length -= self._doc_lengths[position]
+                self._doc_lengths[position] = 0.0
+            if position < self._author_indexed:
+                by_author.setdefault(normalize_author(quote.author), set()).add(position)
+            if id_positions.get(quote.id) == position:
+                del id_positions[quote.id]
+            self._weights.pop(position, None)
+        self._deleted.update(positions)
+        self._deleted_mask |= self._bits(positions)
+        self._refresh_draw_weights(positions)
+        for tag, hidden in by_tag.items():
+            remaining = self._discard_sorted(self._tag_index[tag], hidden)
+            if remaining:
+                self._tag_index[tag] = remaining
+            else:
+                del self._tag_index[tag]
+                del self.tags[bisect.bisect_left(self.tags, tag)]
+        for key, hidden in by_author.items():
+            remaining = self._discard_sorted(self._author_index[key], hidden)
+            if remaining:
+                self._author_index[key] = remaining
+            else:
+                del self._author_index[key]
+                del self._author_names[key]
+                self._author_keys = None
+        self._invalidate_tag_caches(by_tag)
+        self.version += 1
+
+    def _show(self, positions: Sequence[int]):
+        """Put hidden (not removed) quotes back into every index; see _hide"""
+        by_tag: Dict[str, List[int]] = {}
+        by_author: Dict[str, List[int]] = {}
+        id_positions = self._id_map()
+        self._deleted.difference_update(positions)
+        self._deleted_mask &= ~self._bits(positions)
+        self._refresh_draw_weights(positions)
+        for position in positions:
+            quote = self.quotes[position]
+            for tag in set(quote.tags):
+                by_tag.setdefault(tag, []).append(position)
+            if position < self._search_indexed:
+                self._index_search_terms(position, quote)
+            if position < self._author_indexed:
+                by_author.setdefault(normalize_author(quote.author), []).append((position, quote.author))
+            id_positions[quote.id] = position
+        for tag, shown in by_tag.items():
+            if tag not in self._tag_index:
+                bisect.insort(self.tags, tag)
+            self._tag_index[tag] = self._insert_sorted(self._tag_index.get(tag, []), shown)
+        for key, shown in by_author.items():
+            if key not in self._author_index:
+                self._author_names[key] = shown[0][1]
+                self._author_keys = None
+            self._author_index[key] = self._insert_sorted(
+                self._author_index.get(key, []), [position for position, _ in shown])
+        self._flush_segments()
+        self._invalidate_tag_caches(by_tag)
+        self.version += 1
+
+    @staticmethod
+    def _mutable_posting(posting: Sequence[int]) -> Sequence[int]:
+        """A posting that can be patched in place; read-only views over a
+        compiled file are copied into a compact array, not a list of ints"""
+        if isinstance(posting, (list, array)):
+            return posting
+        return array("q", posting)
+
+    def _discard_sorted(self, posting: Sequence[int], positions: Set[int]) -> Sequence[int]:
+        posting = self._mutable_posting(posting)
+        if len(positions) > self.SORTED_PATCH_LIMIT:
+            return [position for position in posting if position not in positions]
+        for position in positions:
+            del posting[bisect.bisect_left(posting, position)]
+        return posting
+
+    def _insert_sorted(self, posting: Sequence[int], positions: List[int]) -> Sequence[int]:
+        posting = self._mutable_posting(posting)
+        if len(positions) > self.SORTED_PATCH_LIMIT:
+            return sorted(chain(posting, positions))
+        for position in positions:
+            bisect.insort(posting, position)
+        return posting
+
+    @staticmethod
+    def _phrase_matches(tokens: List[str], offsets: List[List[int]], slop: int) -> bool:
+        """Whether `tokens`, found at these word offsets in a quote's content, occur
+        as a phrase, or with slop > 0 all within a window of len(tokens) + slop words"""
+        if not slop:
+            starts = set(offsets[0])
+            for index, token_offsets in enumerate(offsets[1:], 1):
+                starts &= {offset - index for offset in token_offsets}
+            return bool(starts)
+        # Merge the position lists and slide a window that covers every token;
+        # a token repeated in the phrase needs that many distinct offsets
+        required: Dict[str, int] = {}
+        token_offsets: Dict[str, List[int]] = {}
+        for token, offsets_of_token in zip(tokens, offsets):
+            required[token] = required.get(token, 0) + 1
+            token_offsets[token] = offsets_of_token
+        merged = sorted((offset, token) for token, offsets_of_token in token_offsets.items()
+                        for offset in offsets_of_token)
+        counts: Dict[str, int] = {}
+        satisfied = 0
+        left = 0
+        for offset, token in merged:
+            counts[token] = counts.get(token, 0) + 1
+            if counts[token] == required[token]:
+                satisfied += 1
+            while satisfied == len(required):
+                if offset - merged[left][0] < len(tokens) + slop:
+                    return True
+                left_token = merged[left][1]
+                if counts[left_token] == required[left_token]:
+                    satisfied -= 1
+                counts[left_token] -= 1
+                left += 1
+        return False
+
+    def find_phrase(self, phrase: str, slop: int = 0) -> List[Quote]:
+        """Quotes whose content contains `phrase`, answered from the positional index"""
+        self._ensure_search_index()
+        positions = self._phrase_positions(self._terms(phrase), slop)
+        return [self.quotes[position] for position in sorted(positions)]
+
+    def _phrase_positions(self, tokens: List[str], slop: int) -> Set[int]:
+        if not tokens:
+            return set()
+        # Fetch each posting once: with on-disk segments every lookup decodes
+        postings = [self._word_positions.get(token) for token in tokens]
+        candidates = self._intersect(postings)
+        return {
+            position for position in candidates
+            if self._phrase_matches(tokens, [posting[position] for posting in postings], slop)
+        }
+
+    def _term_weights(self, content: List[str], author: List[str], tags: List[str]) -> Dict[str, float]:
+        """Term frequencies summed across fields, scaled by FIELD_BOOSTS"""
+        fields = {"content": content, "author": author, "tags": tags}
+        weights: Dict[str, float] = {}
+        for field, tokens in fields.items():
+            boost = self.FIELD_BOOSTS[field]
+            for token in tokens:
+                weights[token] = weights.get(token, 0.0) + boost
+        return weights
+
+    def add_quotes(self, quotes: List[Dict]):
+        """Append quotes and patch the tag index without a full rebuild.
+
+        Raises ValueError, adding nothing, if an id is already in use.
+        """
+        # Wait before taking the lock: background loading needs it to finish
+        self.wait_until_ready()
+        with self._index_lock:
+            self._append([Quote.from_dict(quote) for quote in quotes])
+
+    def _append(self, quotes: List[Quote]):
+        id_positions = self._id_map()
+        new_ids: Set[int] = set()
+        for quote in quotes:
+            if quote.id in id_positions or quote.id in new_ids:
+                raise ValueError(f"A quote with id {quote.id} already exists")
+            new_ids.add(quote.id)
+        if isinstance(self.quotes, ColumnarCorpus) and self.quotes.mapped:
+            # Appending to a mapped corpus would copy every column into memory
+            self._merged_corpus()
+        for quote in quotes:
+            for tag in set(quote.tags):
+                if tag not in self._tag_index:
+                    bisect.insort(self.tags, tag)
+            self.quotes.append(quote)
+            self._index_tags(len(self.quotes) - 1, quote)
+            self._invalidate_tag_caches(quote.tags)
+            id_positions[quote.id] = len(self.quotes) - 1
+        self.version += 1
+
+    def add_quote(self, quote) -> Quote:
+        """Add a single quote; see add_quotes"""
+        quote = Quote.from_dict(quote)
+        self.add_quotes([quote])
+        return quote
+
+    def remove_quote(self, quote_id: int) -> Quote:
+        """Remove a quote, updating every index in proportion to the quote's size.
+
+        The quote's position is left as a tombstone so the positions held by
+        indexes, weights and cursors for other quotes stay valid.
+        """
+        self.wait_until_ready()
+        with self._index_lock:
+            return self._remove(self._position_of(quote_id))
+
+    def _remove(self, position: int) -> Quote:
+        self._hide([position])
+        self._removed.add(position)
+        if position < self._search_indexed:
+            self._folded[position] = ("", "", ())
+        return self.quotes[position]
+
+    def update_quote(self, quote_id: int, **changes) -> Quote:
+        """Change a quote's content, author and/or tags.
+
+        The old record is removed and the new one appended, so the quote moves
+        to the end of the corpus order; its weight is kept.
+        """
+        unknown = set(changes) - {"content", "author", "tags"}
+        if unknown:
+            raise ValueError(f"Cannot update quote fields: {', '.join(sorted(unknown))}")
+        self.wait_until_ready()
+        with self._index_lock:
+            position = self._position_of(quote_id)
+            weight = self._weights.get(position)
+            fields = dict(self._remove(position))
+            fields.update(changes)
+            quote = Quote.from_dict(fields)
+            self._append([quote])
+            if weight is not None:
+                self.set_quote_weight(quote_id, weight)
+        return quote
+
+    def live_quotes(self) -> Iterator[Quote]:
+        """Every quote that has not been removed, in corpus order"""
+        for position, quote in enumerate(self.quotes):
+            if position not in self._deleted:
+                yield quote
+
+    def _live_count(self) -> int:
+        return len(self.quotes) - len(self._deleted)
+
+    def _id_map(self) -> Dict[int, int]:
+        """Quote id -> position of every live quote"""
+        if self._id_positions is None:
+            self._id_positions = {
+                quote_id: position for position, quote_id in enumerate(corpus_ids(self.quotes))
+                if position not in self._deleted
+            }
+        return self._id_positions
+
+    def _position_of(self, quote_id: int) -> int:
+        id_positions = self._id_map()
+        if quote_id not in id_positions:
+            raise KeyError(f"No quote with id {quote_id}")
+        return id_positions[quote_id]
+
+    def mount_source(self, name: str, source, enabled: bool = True,
+                     dedupe: Optional[bool] = None) -> CorpusSource:
+        """Mount a quote pack alongside the current corpus without copying it.
+
+        `source` is a compiled corpus path, a .jsonl/.csv path or a sequence
+        of quotes. The corpus loaded at startup becomes the "builtin" source.
+        When several enabled packs hold the same quote id, the copy from the
+        earliest mounted pack is shown (see _source_rank). With dedupe (the
+        service's setting by default), pack quotes that near-duplicate a live
+        quote or an earlier pack quote are removed at mount time. Invalid
+        records are skipped; the returned source counts them in `invalid` and
+        describes the first few in `errors`. Only the tag index is updated
+        now; the search indexes catch up on the pack on the next search.
+        """
+        if name in self.sources:
+            raise ValueError(f"A source named {name!r} is already mounted")
+        self.wait_until_ready()
+        with self._index_lock:
+            self._merged_corpus()
+            rejected: List[str] = []
+            quotes = open_quote_source(source, on_error=rejected.append)
+            mounted = CorpusSource(name, quotes, self.quotes.add_part(quotes))
+            mounted.invalid = len(rejected)
+            mounted.errors = rejected[:QuoteImporter.MAX_REPORTED_ERRORS]
+            self.sources[name] = mounted
+            positions = mounted.positions
+            self._deleted.update(positions)
+            self._deleted_mask |= self._bits(positions)
+            if self.dedupe if dedupe is None else dedupe:
+                self._drop_near_duplicates(positions)
+            mounted.enabled = False
+            if enabled:
+                self.enable_source(name)
+        return mounted
+
+    def _merged_corpus(self) -> MergedCorpus:
+        """Turn the corpus loaded at startup into the "builtin" source of a MergedCorpus"""
+        if not isinstance(self.quotes, MergedCorpus):
+            builtin = self.quotes
+            self.quotes = MergedCorpus([builtin])
+            self.sources["builtin"] = CorpusSource("builtin", builtin, 0)
+        return self.quotes
+
+    def _drop_near_duplicates(self, positions: Sequence[int]):
+        """Remove the quotes at `positions` that near-duplicate a live quote
+        outside them or an earlier quote among them"""
+        candidates = set(positions)
+        order = [position for position in range(len(self.quotes))
+                 if position not in self._deleted and position not in candidates]
+        order.extend(positions)
+        detector = NearDuplicateDetector()
+        for position in order:
+            if position not in self._signatures:
+                self._signatures[position] = detector.signature(self.quotes[position].content)
+        clusters = detector.clusters_of([self._signatures[position] for position in order])
+        dropped = [order[index] for group in clusters for index in group[1:]
+                   if order[index] in candidates]
+        self._hide([position for position in dropped if position not in self._deleted])
+        self._removed.update(dropped)
+
+    def _source_rank(self, position: int) -> int:
+        """Duplicate priority of a quote: its pack's mount order, with quotes
+        added directly (outside any pack) ahead of every pack"""
+        for rank, source in enumerate(self.sources.values()):
+            if position in source.positions:
+                return rank
+        return -1
+
+    def enable_source(self, name: str):
+        """Show a mounted pack again; only its own quotes and the lower-priority
+        duplicates they displace are re-indexed"""
+        with self._index_lock:
+            source = self.sources[name]
+            if source.enabled:
+                return
+            source.enabled = True
+            rank = list(self.sources).index(name)
+            id_positions = self._id_map()
+            shown, displaced = [], []
+            for position in source.positions:
+                quote_id = self.quotes[position].id
+                if position in self._removed or source.position_of(quote_id) != position:
+                    continue
+                current = id_positions.get(quote_id)
+                if current is not None:
+                    if self._source_rank(current) < rank:
+                        continue
+                    displaced.append(current)
+                shown.append(position)
+            self._hide(displaced)
+            self._show(shown)
+
+    def disable_source(self, name: str):
+        """Hide a mounted pack; duplicates it was shadowing in other enabled packs reappear"""
+        with self._index_lock:
+            source = self.sources[name]
+            if not source.enabled:
+                return
+            source.enabled = False
+            hidden = [position for position in source.positions if position not in self._deleted]
+            self._hide(hidden)
+            id_positions = self._id_map()
+            shown = []
+            for position in hidden:
+                quote_id = self.quotes[position].id
+                for other in self.sources.values():
+                    duplicate = other.position_of(quote_id) if other.enabled else None
+                    if (duplicate is not None and duplicate not in self._removed
+                            and quote_id not in id_positions):
+                        shown.append(duplicate)
+                        id_positions[quote_id] = duplicate
+                        break
+            self._show(shown)
+
+    def set_quote_weight(self, quote_id: int, weight: float):
+        """Set the relative draw weight of a quote (1.0 by default, 0 disables it)"""
+        if weight < 0:
+            raise ValueError("Quote weights must be non-negative")
+        position = self._position_of(quote_id)
+        if weight == 1.0:
+            self._weights.pop(position, None)
+        else:
+            self._weights[position] = weight
+        self._refresh_draw_weights([position])
+        for tag in set(self.quotes[position].tags):
+            table = self._alias_tables.get(tag)
+            if table is not None:
+                table[bisect.bisect_left(self._tag_index[tag], position)] = weight
+
+    def _draw_weight(self, position: int) -> float:
+        return 0.0 if position in self._deleted else self._weights.get(position, 1.0)
+
+    def _refresh_draw_weights(self, positions: Sequence[int]):
+        """Patch the all-quotes alias table in place; it is indexed by position,
+        so hiding, showing or reweighting a quote never invalidates it"""
+        table = self._alias_tables.get("")
+        if table is not None:
+            for position in positions:
+                if position < len(table):
+                    table[position] = self._draw_weight(position)
+
+    def _invalidate_tag_caches(self, tags):
+        """Drop the alias tables and bitsets of tags whose postings changed; they are rebuilt on next use"""
+        for tag in tags:
+            self._alias_tables.pop(tag, None)
+            self._tag_bitsets.pop(tag, None)
+
+    def _alias_table(self, tag: str) -> BlockedAliasTable:
+        """Alias table over a tag's postings ("" for every position), extended
+        with any positions appended since it was built"""
+        table = self._alias_tables.get(tag)
+        if table is None:
+            table = self._alias_tables[tag] = BlockedAliasTable()
+        positions = self._tag_index.get(tag, ()) if tag else range(len(self.quotes))
+        if len(table) < len(positions):
+            table.extend(self._draw_weight(position) for position in islice(positions, len(table), None))
+        return table
+
+    def get_random_quote(self, tag: str = None) -> Optional[Quote]:
+        """Get a random quote, optionally filtered by tag.
+
+        Once any quote has a custom weight, draws go through per-tag alias
+        tables so weighted picks stay O(1).
+        """
+        if self._weights:
+            index = self._alias_table(tag or "").sample()
+            if index is None:
+                return None
+            return self.quotes[self._tag_index[tag][index] if tag else index]
+        if not tag:
+            if not self._live_count():
+                return None
+            while True:
+                position = random.randrange(len(self.quotes))
+                if position not in self._deleted:
+                    return self.quotes[position]
+        positions = self._tag_index.get(tag)
+        return self.quotes[random.choice(positions)] if positions else None
+
+    @staticmethod
+    def _bits(positions) -> int:
+        """Bitset (as an int) with the given positions set; the work is
+        proportional to the positions' span, not to the corpus"""
+        if not positions:
+            return 0
+        low = min(positions)
+        if len(positions) == 1:
+            return 1 << low
+        bits = bytearray((max(positions) - low + 8) // 8)
+        for position in positions:
+            position -= low
+            bits[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(bits, "little") << low
+
+    def _tag_bits(self, tag: str) -> int:
+        """Bitset (as an int) of the positions tagged `tag`"""
+        if tag not in self._tag_bitsets:
+            self._tag_bitsets[tag] = self._bits(self._tag_index.get(tag, ()))
+        return self._tag_bitsets[tag]
+
+    def tag_bitmap(self, all_of=(), any_of=(), none_of=()) -> int:
+        """Bitmap of quote positions matching a boolean tag filter.
+
+        e.g. tag_bitmap(all_of=["success", "perseverance"], none_of=["failure"])
+        for `success AND perseverance NOT failure`. Per-tag bitsets are cached
+        and combined with whole-int AND/OR, never per quote.
+        """
+        result = ((1 << len(self.quotes)) - 1) & ~self._deleted_mask
+        for tag in all_of:
+            result &= self._tag_bits(tag)
+        if any_of:
+            union = 0
+            for tag in any_of:
+                union |= self._tag_bits(tag)
+            result &= union
+        for tag in none_of:
+            result &= ~self._tag_bits(tag)
+        return result
+
+    def random_from_bitmap(self, bitmap: int) -> Optional[Quote]:
+        """Pick a uniformly random set position of `bitmap` without listing the matches"""
+        count = bin(bitmap).count("1")
+        if not count:
+            return None
+        remaining = random.randrange(count)
+        data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+        for byte_index, byte in enumerate(data):
+            if remaining >= BYTE_POPCOUNT[byte]:
+                remaining -= BYTE_POPCOUNT[byte]
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    if not remaining:
+                        return self.quotes[byte_index * 8 + bit]
+                    remaining -= 1
+        return None
+
+    def get_filtered_quote(self, all_of=(), any_of=(), none_of=()) -> Optional[Quote]:
+        """Random quote matching a boolean tag filter (see tag_bitmap)"""
+        return self.random_from_bitmap(self.tag_bitmap(all_of, any_of, none_of))
+
+    def next_shuffled_quote(self, tag: Optional[str], state: Dict) -> Optional[Quote]:
+        """Draw the next quote of a no-repeat stream over the quotes tagged `tag`.
+
+        `state` holds the stream's ShuffleCursor (seed, position, pool size)
+        and is updated in place; persist it to resume the stream later. No
+        quote repeats until the whole pool has been shown.
+        """
+        positions = self._tag_index.get(tag, ()) if tag else range(len(self.quotes))
+        if not positions or not self._live_count():
+            return None
+        cursor = ShuffleCursor.from_dict(state, len(positions))
+        index = cursor.next()
+        while positions[index] in self._deleted:
+            index = cursor.next()
+        state.clear()
+        state.update(cursor.to_dict())
+        return self.quotes[positions[index]]
+
+    def quote_of_the_day(self, day: Optional[date] = None, tag: Optional[str] = None,
+                         salt: str = "") -> Optional[Quote]:
+        """Deterministic quote for a day, computed in O(1) with no stored state.
+
+        Days are mapped through a ShuffleCursor permutation seeded from (tag,
+        salt, cycle), so every client with the same corpus shows the same
+        quote and no quote repeats until the pool has been cycled through.
+        """
+        positions = self._tag_index.get(tag, ()) if tag else range(len(self.quotes))
+        if not positions or not self._live_count():
+            return None
+        day_number = (day or date.today()).toordinal()
+        cycle, offset = divmod(day_number, len(positions))
+        digest = hashlib.blake2b(f"{tag or ''}|{salt}|{cycle}".encode(), digest_size=8).digest()
+        cursor = ShuffleCursor(len(positions), int.from_bytes(digest, "little"))
+        position = positions[cursor.permute(offset)]
+        while position in self._deleted:
+            offset = (offset + 1) % len(positions)
+            position = positions[cursor.permute(offset)]
+        return self.quotes[position]
+
+    def get_tags(self) -> List[str]:
+        """Get all available tags"""
+        return self.tags
+
+    def search_quotes(self, query: str, mode: str = "substring",
+                      limit: Optional[int] = None) -> List[Quote]:
+        """Search quotes by content, author or tag.
+
+        mode="substring" matches the query anywhere in a field; mode="tokens"
+        requires every word of the query to appear as a whole word; mode="fuzzy"
+        tolerates typos and ranks quotes by trigram similarity to the query;
+        mode="ranked" returns the best BM25 matches for any query word;
+        mode="query" accepts author:, tag:, "phrases", -negation and OR
+        (see explain_query for how a query is executed).
+        limit caps the number of results (RANKED_LIMIT by default when ranked
+        or fuzzy). Results are cached until the corpus version changes.
+        """
+        if mode in ("ranked", "fuzzy"):
+            limit = limit or self.RANKED_LIMIT
+        return list(self._cached_results(query, mode, limit))
+
+    def _cached_results(self, query: str, mode: str, limit: Optional[int]) -> List[Quote]:
+        """Results from the search cache, computed and stored on a miss; treat as read-only"""
+        key = self._cache_key(query, mode, limit)
+        results = self.search_cache.get(key, self.version)
+        if results is None:
+            if mode == "ranked":
+                results = self._search_ranked(query, limit)
+            elif mode == "fuzzy":
+                results = self._search_fuzzy(query, limit)
+            else:
+                results = list(islice(self._iter_matches(query, mode), limit))
+            self.search_cache.put(key, self.version, results)
+        return results
+
+    @staticmethod
+    def _cache_key(query: str, mode: str, limit: Optional[int]) -> tuple:
+        return (query if mode == "query" else fold_text(query), mode, limit)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size of the search result cache"""
+        return self.search_cache.stats()
+
+    def iter_search(self, query: str, offset: int = 0, limit: Optional[int] = None,
+                    mode: str = "substring") -> Iterator[Quote]:
+        """Lazily yield search results, skipping `offset` and stopping after `limit`.
+
+        Substring, token and query matches are produced one at a time, so a
+        caller can hold the iterator as a cursor and pull further pages on
+        demand. A full result list already in the search cache is sliced
+        instead, and a cursor that runs out after at most CURSOR_CACHE_LIMIT
+        results stores them there.
+        """
+        stop = None if limit is None else offset + limit
+        if mode in ("ranked", "fuzzy"):
+            return islice(self._cached_results(query, mode, stop), offset, stop)
+        key = self._cache_key(query, mode, None)
+        cached = self.search_cache.get(key, self.version)
+        if cached is not None:
+            return islice(cached, offset, stop)
+        return islice(self._iter_and_cache(query, mode, key), offset, stop)
+
+    def _iter_and_cache(self, query: str, mode: str, key: tuple) -> Iterator[Quote]:
+        version = self.version
+        produced: Optional[List[Quote]] = []
+        for quote in self._iter_matches(query, mode):
+            if produced is not None:
+                produced.append(quote)
+                if len(produced) > self.CURSOR_CACHE_LIMIT:
+                    produced = None
+            yield quote
+        if produced is not None:
+            self.search_cache.put(key, version, produced)
+
+    def _iter_matches(self, query: str, mode: str) -> Iterator[Quote]:
+        self._ensure_search_index()
+        if mode == "query":
+            return (self.quotes[position] for position in sorted(self._execute_query(query)))
+        if mode == "tokens":
+            return self._search_tokens(query)
+        if mode == "fuzzy":
+            return iter(self._search_fuzzy(query, None))
+        if mode != "substring":
+            raise ValueError(f"Unknown search mode: {mode}")
+        query = fold_text(query)
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            candidates = (p for p in range(len(self.quotes)) if p not in self._deleted)
+        else:
+            candidates = sorted(self._intersect(
+                self._trigram_index.get(trigram) for trigram in query_trigrams
+            ))
+        return (
+            self.quotes[position] for position in candidates
+            if self._matches_substring(position, query)
+        )
+
+    def _plan_clause(self, clause: QueryClause) -> Tuple[Optional[Set[int]], Optional[Callable], str]:
+        """Candidate positions from an index (None means every quote), an optional
+        verifier for those candidates, and a description for explain_query"""
+        value = clause.value
+        if clause.kind == "tag":
+            positions = set()
+            for tag in self._tags_matching(value):
+                positions.update(self._tag_index[tag])
+            return positions, None, f"tag index, {len(positions)} postings"
+        if clause.kind == "author":
+            self._ensure_author_index()
+            key = normalize_author(value)
+            if key in self._author_index:
+                positions = set(self._author_index[key])
+                return positions, None, f"author index, {len(positions)} postings"
+            folded = fold_name(value)
+            candidates = self._intersect(self._token_index.get(token) for token in self._terms(value))
+            verify = lambda position: folded in fold_name(self.quotes[position].author)
+            return candidates, verify, f"token index, verify {len(candidates)} candidates"
+        if clause.kind == "phrase":
+            positions = self._phrase_positions(self._terms(value), clause.slop)
+            return positions, None, f"positional index, {len(positions)} matches"
+        term = fold_text(value)
+        verify = lambda position: self._matches_substring(position, term)
+        if not trigrams(term):
+            return None, verify, f"scan {self._live_count()} quotes (term shorter than 3 characters)"
+        candidates = self._intersect(self._trigram_index.get(trigram) for trigram in trigrams(term))
+        return candidates, verify, f"trigram index, verify {len(candidates)} candidates"
+
+    def _tags_matching(self, value: str) -> List[str]:
+        """Tags equal to `value` once both are folded, as bare terms are"""
+        if self._tags_by_folded_version != self.version:
+            self._tags_by_folded = {}
+            for tag in self.tags:
+                self._tags_by_folded.setdefault(fold_text(tag), []).append(tag)
+            self._tags_by_folded_version = self.version
+        return self._tags_by_folded.get(fold_text(value), [])
+
+    def _execute_query(self, query: str) -> Set[int]:
+        results: Set[int] = set()
+        for group in parse_query(query):
+            plans = [(clause, self._plan_clause(clause)) for clause in group]
+            indexed = [positions for clause, (positions, _, _) in plans
+                       if not clause.negated and positions is not None]
+            if indexed:
+                candidates = self._intersect(indexed)
+            else:
+                candidates = set(range(len(self.quotes))) - self._deleted
+            for clause, (positions, verify, _) in plans:
+                if clause.negated and verify is None:
+                    candidates -= positions
+                elif clause.negated:
+                    candidates = {
+                        position for position in candidates
+                        if not ((positions is None or position in positions)
+                                and verify(position))
+                    }
+                elif verify is not None:
+                    candidates = {position for position in candidates if verify(position)}
+            results |= candidates
+        return results
+
+    def explain_query(self, query: str) -> str:
+        """Describe how each operator of a query is answered: index lookup or scan"""
+        self._ensure_search_index()
+        lines = []
+        for number, group in enumerate(parse_query(query), 1):
+            lines.append(f"OR group {number}:")
+            for clause in group:
+                description = self._plan_clause(clause)[2]
+                action = "exclude" if clause.negated else "match"
+                lines.append(f"  {action} {clause}: {description}")
+        return "\n".join(lines)
+
+    def _matches_substring(self, position: int, query: str) -> bool:
+        """Substring test against the cached folded fields; `query` must be folded"""
+        content, author, tags = self._folded[position]
+        return query in content or query in author or any(query in tag for tag in tags)
+
+    @staticmethod
+    def _intersect(postings) -> Set[int]:
+        """Intersect posting sets smallest first; a missing posting means no match"""
+        postings = list(postings)
+        if not postings or not all(postings):
+            return set()
+        postings.sort(key=len)
+        positions = set(postings[0])
+        for posting in postings[1:]:
+            positions = {position for position in positions if position in posting}
+            if not positions:
+                break
+        return positions
+
+    def _search_tokens(self, query: str) -> Iterator[Quote]:
+        positions = self._intersect(
+            self._token_index.get(token) for token in set(self._terms(query))
+        )
+        return (self.quotes[position] for position in sorted(positions))
+
+    def _search_fuzzy(self, query: str, limit: Optional[int]) -> List[Quote]:
+        """The top `limit` quotes with a field (content, author or a tag) similar to the query.
+
+        A field scores the mean, over the query's words, of the best Dice
+        coefficient between the word's trigrams and those of a field word. A
+        quote scores its best field, must reach FUZZY_THRESHOLD, and ties go
+        to the quote whose fields match more.
+
+        A query word sharing c of its n trigrams with a quote has a Dice
+        coefficient of at most 2c / (n + c) with any word of it, so the
+        trigram index bounds every quote's score before anything is scored.
+        Candidates are scored best bound first into a bounded heap, stopping
+        once no remaining bound can reach the heap.
+        """
+        self._ensure_search_index()
+        query = fold_text(query)
+        words = [word_trigrams(word) for word in TOKEN_PATTERN.findall(query)]
+        words = [word for word in words if word]
+        if not words:
+            return list(islice(self._iter_matches(query, "substring"), limit))
+        bounds: Dict[int, float] = {}
+        for word in words:
+            shared: Dict[int, int] = {}
+            for trigram in word:
+                for position in self._trigram_index.get(trigram, ()):
+                    shared[position] = shared.get(position, 0) + 1
+            for position, count in shared.items():
+                bounds[position] = bounds.get(position, 0.0) + 2 * count / (len(word) + count)
+        # Small slack so float rounding never drops a quote scoring exactly the threshold
+        minimum = self.FUZZY_THRESHOLD * len(words) - 1e-9
+        candidates = sorted((position for position, bound in bounds.items() if bound >= minimum),
+                            key=bounds.__getitem__, reverse=True)
+        heap: List[Tuple[float, float, int]] = []
+        word_scores: Dict[str, Tuple[float, ...]] = {}
+        # Authors and tags repeat across quotes, so their scores are memoized too
+        label_scores: Dict[str, float] = {}
+        for position in candidates:
+            if limit is not None and len(heap) >= limit and bounds[position] / len(words) + 1e-9 < heap[0][0]:
+                break
+            content, author, tags = self._folded[position]
+            field_scores = [self._fuzzy_field_score(words, content, word_scores)]
+            for label in (author, *tags):
+                if label not in label_scores:
+                    label_scores[label] = self._fuzzy_field_score(words, label, word_scores)
+                field_scores.append(label_scores[label])
+            best = max(field_scores)
+            if best < self.FUZZY_THRESHOLD:
+                continue
+            item = (best, sum(field_scores), -position)
+            if limit is None or len(heap) < limit:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        return [self.quotes[-position] for _, _, position in sorted(heap, reverse=True)]
+
+    @staticmethod
+    def _fuzzy_field_score(words: List[frozenset], field: str,
+                           word_scores: Dict[str, Tuple[float, ...]]) -> float:
+        """Mean over `words` of the best Dice coefficient with a word of `field`;
+        `word_scores` memoizes each field word's coefficients across quotes"""
+        rows = []
+        for field_word in set(TOKEN_PATTERN.findall(field)):
+            row = word_scores.get(field_word)
+            if row is None:
+                field_trigrams = word_trigrams(field_word)
+                row = word_scores[field_word] = tuple(
+                    2 * len(word & field_trigrams) / (len(word) + len(field_trigrams)) for word in words
+                )
+            rows.append(row)
+        if not rows:
+            return 0.0
+        return sum(map(max, zip(*rows))) / len(words)
+
+    def _search_ranked(self, query: str, limit: Optional[int]) -> List[Quote]:
+        """Score quotes with BM25 and keep only the top `limit` in a bounded heap"""
+        self._ensure_search_index()
+        count = self._live_count()
+        if not count:
+            return []
+        average_length = self._total_length / count or 1.0
+        k1, b = self.BM25_K1, self.BM25_B
+        scores: Dict[int, float] = {}
+        for token in set(self._terms(query)):
+            posting = self._token_index.get(token)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for position, frequency in posting.items():
+                norm = k1 * (1 - b + b * self._doc_lengths[position] / average_length)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (k1 + 1) / (frequency + norm)
+        key = lambda item: (item[1], -item[0])
+        if limit is None:
+            best = sorted(scores.items(), key=key, reverse=True)
+        else:
+            best = heapq.nlargest(limit, scores.items(), key=key)
+        return [self.quotes[position] for position, _ in best]
+
+class QuoteImporter:
+    """Streams quotes from .jsonl/.csv files into a QuoteService.
+
+    Records are validated, deduplicated by id and by content hash (against
+    the corpus and earlier records) and added in chunks of `chunk_size`, so
+    memory beyond the corpus itself stays bounded by the chunk.
+    """
+    MAX_REPORTED_ERRORS = 20
+
+    def __init__(self, quote_service: QuoteService, chunk_size: int = 10_000):
+        self.quote_service = quote_service
+        self.chunk_size = chunk_size
+        quote_service.wait_until_ready()
+        self._ids = {quote.id for quote in quote_service.live_quotes()}
+        self._content_hashes = {self._content_hash(quote.content) for quote in quote_service.live_quotes()}
+
+    @staticmethod
+    def _content_hash(content: str) -> int:
+        return int.from_bytes(hashlib.blake2b(fold_name(content).encode(), digest_size=8).digest(), "little")
+
+    def import_file(self, path: str) -> Dict:
+        """Import one file and return counts, sample errors and throughput"""
+        stats = {"read": 0, "imported": 0, "invalid": 0, "duplicate_id": 0,
+                 "duplicate_content": 0, "errors": []}
+
+        def reject(location: str, message: str):
+            stats["invalid"] += 1
+            if len(stats["errors"]) < self.MAX_REPORTED_ERRORS:
+                stats["errors"].append(f"{path} {location}: {message}")
+
+        started = time.perf_counter()
+        chunk: List[Quote] = []
+        records = read_quote_source(path, on_error=lambda line, message: reject(f"line {line}", message))
+        for record_number, record in enumerate(records, 1):
+            stats["read"] += 1
+            error = validate_quote_record(record)
+            if error:
+                reject(f"record {record_number}", error)
+                continue
+            quote = Quote.from_dict(record)
+            content_hash = self._content_hash(quote.content)
+            if quote.id in self._ids:
+                stats["duplicate_id"] += 1
+            elif content_hash in self._content_hashes:
+                stats["duplicate_content"] += 1
+            else:
+                self._ids.add(quote.id)
+                self._content_hashes.add(content_hash)
+                chunk.append(quote)
+                if len(chunk) >= self.chunk_size:
+                    stats["imported"] += self._flush(chunk)
+        stats["imported"] += self._flush(chunk)
+        stats["seconds"] = time.perf_counter() - started
+        stats["quotes_per_second"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    def _flush(self, chunk: List[Quote]) -> int:
+        count = len(chunk)
+        if chunk:
+            self.quote_service.add_quotes(chunk)
+            chunk.clear()
+        return count
+
+_shared_quote_service: Optional[QuoteService] = None
+_shared_quote_service_lock = threading.Lock()
+
+def get_quote_service(**options) -> QuoteService:
+    """Return the process-wide QuoteService, creating it on first use.
+
+    `options` are passed to QuoteService only by the first caller; later
+    callers get the same instance so the corpus and indexes exist once.
+    """
+    global _shared_quote_service
+    if _shared_quote_service is None:
+        with _shared_quote_service_lock:
+            if _shared_quote_service is None:
+                _shared_quote_service = QuoteService(**options)
+    return _shared_quote_service
+
+class StorageManager:
+    def __init__(self):
+        self.data_dir = os.path.join(os.path.expanduser("~"), ".motivation_app")
+        self.favorites_file = os.path.join(self.data_dir, "favorites.json")
+        self.history_file = os.path.join(self.data_dir, "history.json")
+        self.shuffle_file = os.path.join(self.data_dir, "shuffle_state.json")
+        self._init_storage()
+
+    def _init_storage(self):
+        os.makedirs(self.data_dir, exist_ok=True)
+        for file in [self.favorites_file, self.history_file]:
+            if not os.path.exists(file):
+                with open(file, 'w') as f:
+                    json.dump([], f)
+        if not os.path.exists(self.shuffle_file):
+            with open(self.shuffle_file, 'w') as f:
+                json.dump({}, f)
+
+    def get_shuffle_state(self, user: str, tag: str) -> Dict:
+        """Saved no-repeat cursor for a (user, tag) quote stream"""
+        with open(self.shuffle_file, 'r') as f:
+            return json.load(f).get(f"{user}|{tag}", {})
+
+    def save_shuffle_state(self, user: str, tag: str, state: Dict):
+        with open(self.shuffle_file, 'r') as f:
+            states = json.load(f)
+        states[f"{user}|{tag}"] = state
+        with open(self.shuffle_file, 'w') as f:
+            json.dump(states, f)
+
+    def add_favorite(self, quote: Quote):
+        favorites = self.get_favorites()
+        quote = dict(quote)
+        if quote not in favorites:
+            favorites.append(quote)
+            with open(self.favorites_file, 'w') as f:
+                json.dump(favorites, f)
+
+    def get_favorites(self) -> List[Dict]:
+        with open(self.favorites_file, 'r') as f:
+            return json.load(f)
+
+    def add_to_history(self, quote: Quote):
+        history = self.get_history()
+        quote = dict(quote)
+        quote["viewed_at"] = datetime.now().isoformat()
+        history.append(quote)
+        with open(self.history_file, 'w') as f:
+            json.dump(history, f)
+
+    def get_history(self) -> List[Dict]:
+        with open(self.history_file, 'r') as f:
+            return json.load(f)
+
+    def export_favorites(self, filepath: str):
+        favorites = self.get_favorites()
+        with open(filepath, 'w') as f:
+            for quote in favorites:
+                f.write(f'"{quote["content"]}" - {quote["author"]}\n')
+
+class NotificationManager:
+    def __init__(self, quote_service: Optional[QuoteService] = None):
+        self.notification_time = datetime.strptime("09:00", "%H:%M").time()
+        self.is_running = False
+        self.thread = None
+        self.quote_service = quote_service or get_quote_service(
+            lazy=True, corpus_path=compiled_builtin_corpus())
+
+    def set_notification_time(self, hour: int, minute: int):
+        self.notification_time = datetime.strptime(
+            f"{hour:02d}:{minute:02d}", 
+            "%H:%M"
+        ).time()
+
+    def show_notification(self):
+        self.quote_service.wait_until_ready()
+        quote = self.quote_service.quote_of_the_day()
+        if quote:
+            notification.notify(
+                title="Daily Motivation",
+                message=f'"{quote.content}" - {quote.author}',
+                timeout=10
+            )
+
+    def _notification_loop(self):
+        while self.is_running:
+            now = datetime.now().time()
+            if (now.hour == self.notification_time.hour and 
+                now.minute == self.notification_time.minute):
+                self.show_notification()
+                time.sleep(60)
+            time.sleep(30)
+
+    def start_notifications(self):
+        if not self.is_running:
+            self.is_running = True
+            self.thread = threading.Thread(target=self._notification_loop)
+            self.thread.daemon = True
+            self.thread.start()
+
+    def stop_notifications(self):
+        self.is_running = False
+        if self.thread:
+            self.thread.join()
+
+class MotivationApp:
+    SEARCH_PAGE_SIZE = 50
+    STARTUP_READY_TIMEOUT = 0.5
+    COMPLETER_POLL_MS = 2000
+
+    def __init__(self, user: str = "default"):
+        self.user = user
+        self.quote_service = get_quote_service(lazy=True, corpus_path=compiled_builtin_corpus())
+        self.notification_manager = NotificationManager(self.quote_service)
+        self.storage_manager = StorageManager()
+        
+        ctk.set_appearance_mode("dark")
+        ctk.set_default_color_theme("dark-blue")
+        
+        self.window = ctk.CTk()
+        self.window.title("Daily Motivation")
+        self.window.geometry("700x400")
+        
+        self.tags = [""] + self.quote_service.get_tags()
+        self.current_quote = None
+        self.search_cursor = None
+        
+        self.setup_ui()
+
+    def setup_ui(self):
+        main_container = ctk.CTkTabview(self.window)
+        main_container.pack(pady=20, padx=20, fill="both", expand=True)
+        
+        main_container.add("Daily Quote")
+        main_container.add("Search")
+        main_container.add("Favorites")
+        main_container.add("History")
+        main_container.add("Settings")
+        
+        self.setup_daily_quote_tab(main_container.tab("Daily Quote"))
+        self.setup_search_tab(main_container.tab("Search"))
+        self.setup_favorites_tab(main_container.tab("Favorites"))
+        self.setup_history_tab(main_container.tab("History"))
+        self.setup_settings_tab(main_container.tab("Settings"))
+
+    def setup_daily_quote_tab(self, parent):
+        category_frame = ctk.CTkFrame(parent)
+        category_frame.pack(pady=10, padx=10, fill="x")
+        
+        ctk.CTkLabel(category_frame, text="Category:").pack(side="left", padx=5)
+        self.category_var = ctk.StringVar(value="")
+        self.category_dropdown = ctk.CTkOptionMenu(
+            category_frame,
+            values=self.tags,
+            variable=self.category_var,
+            command=lambda _: self.update_quote()
+        )
+        self.category_dropdown.pack(side="left", padx=5)
+        
+        self.tag_filter: Dict[str, str] = {}
+        ctk.CTkButton(
+            category_frame,
+            text="Tag Filter...",
+            command=self.open_tag_filter
+        ).pack(side="left", padx=5)
+        
+        quote_frame = ctk.CTkFrame(parent)
+        quote_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        
+        self.quote_text = ctk.CTkTextbox(quote_frame, height=150)
+        self.quote_text.pack(pady=10, padx=10, fill="both", expand=True)
+        self.quote_text.configure(state="disabled")
+        
+        buttons_frame = ctk.CTkFrame(quote_frame)
+        buttons_frame.pack(pady=10, fill="x")
+        
+        ctk.CTkButton(
+            buttons_frame,
+            text="New Quote",
+            command=self.update_quote
+        ).pack(side="left", padx=5)
+        
+        ctk.CTkButton(
+            buttons_frame,
+            text="Add to Favorites",
+            command=self.add_to_favorites
+        ).pack(side="left", padx=5)
+
+    def setup_search_tab(self, parent):
+        search_frame = ctk.CTkFrame(parent)
+        search_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        
+        search_entry = ctk.CTkEntry(
+            search_frame,
+            placeholder_text='Search quotes... (author:Name tag:courage "a phrase" -word OR)'
+        )
+        search_entry.pack(pady=10, padx=10, fill="x")
+        self.search_entry = search_entry
+        self.suggestion_job = None
+        search_entry.bind("<KeyRelease>", lambda _: self.schedule_suggestions())
+        
+        self.suggestions_frame = ctk.CTkFrame(search_frame)
+        self.suggestions_frame.pack(padx=10, fill="x")
+        
+        ctk.CTkButton(
+            search_frame,
+            text="Search",
+            command=lambda: self.search_quotes(search_entry.get())
+        ).pack(pady=5)
+        
+        self.search_results = ctk.CTkTextbox(search_frame)
+        self.search_results.pack(pady=10, padx=10, fill="both", expand=True)
+        self.search_results.configure(state="disabled")
+        
+        self.load_more_button = ctk.CTkButton(
+            search_frame,
+            text="Load More",
+            command=self.load_more_results,
+            state="disabled"
+        )
+        self.load_more_button.pack(pady=5)
+
+    def setup_favorites_tab(self, parent):
+        favorites_frame = ctk.CTkFrame(parent)
+        favorites_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        
+        self.favorites_text = ctk.CTkTextbox(favorites_frame)
+        self.favorites_text.pack(pady=10, padx=10, fill="both", expand=True)
+        self.favorites_text.configure(state="disabled")
+        
+        ctk.CTkButton(
+            favorites_frame,
+            text="Export Favorites",
+            command=self.export_favorites
+        ).pack(pady=10)
+        
+        self.update_favorites_display()
+
+    def setup_history_tab(self, parent):
+        history_frame = ctk.CTkFrame(parent)
+        history_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        
+        self.history_text = ctk.CTkTextbox(history_frame)
+        self.history_text.pack(pady=10, padx=10, fill="both", expand=True)
+        self.history_text.configure(state="disabled")
+        
+        self.update_history_display()
+
+    def setup_settings_tab(self, parent):
+        settings_frame = ctk.CTkFrame(parent)
+        settings_frame.pack(pady=10, padx=10, fill="x")
+        
+        ctk.CTkLabel(settings_frame, text="Notification Time (24h):").pack(pady=5)
+        
+        time_entry = ctk.CTkEntry(settings_frame, placeholder_text="HH:MM")
+        time_entry.pack(pady=5)
+        
+        def set_notification():
+            try:
+                hour, minute = map(int, time_entry.get().split(":"))
+                self.notification_manager.set_notification_time(hour, minute)
+                self.notification_manager.start_notifications()
+                self.show_message("Success", "Notification time set successfully!")
+            except ValueError:
+                self.show_error("Please enter time in HH:MM format")
+        
+        ctk.CTkButton(
+            settings_frame,
+            text="Set Daily Notification",
+            command=set_notification
+        ).pack(pady=10)
+
+    def open_tag_filter(self):
+        """Multi-select dialog: each tag can be required, excluded or ignored"""
+        dialog = ctk.CTkToplevel(self.window)
+        dialog.title("Tag Filter")
+        dialog.geometry("400x450")
+        
+        tags_frame = ctk.CTkScrollableFrame(dialog)
+        tags_frame.pack(pady=10, padx=10, fill="both", expand=True)
+        choices = {}
+        for tag in self.quote_service.get_tags():
+            row = ctk.CTkFrame(tags_frame)
+            row.pack(fill="x", pady=2)
+            ctk.CTkLabel(row, text=tag).pack(side="left", padx=5)
+            choices[tag] = ctk.StringVar(value=self.tag_filter.get(tag, "any"))
+            ctk.CTkSegmentedButton(
+                row,
+                values=["any", "must", "not"],
+                variable=choices[tag]
+            ).pack(side="right", padx=5)
+        
+        def apply_filter():
+            self.tag_filter = {
+                tag: choice.get() for tag, choice in choices.items()
+                if choice.get() != "any"
+            }
+            dialog.destroy()
+            self.update_quote()
+        
+        ctk.CTkButton(dialog, text="Apply", command=apply_filter).pack(pady=10)
+
+    def update_quote(self):
+        tag = self.category_var.get()
+        if self.tag_filter:
+            required = [t for t, choice in self.tag_filter.items() if choice == "must"]
+            excluded = [t for t, choice in self.tag_filter.items() if choice == "not"]
+            quote_data = self.quote_service.get_filtered_quote(
+                all_of=required + ([tag] if tag else []),
+                none_of=excluded
+            )
+        elif self.quote_service.ready.is_set():
+            state = self.storage_manager.get_shuffle_state(self.user, tag)
+            quote_data = self.quote_service.next_shuffled_quote(tag, state)
+            self.storage_manager.save_shuffle_state(self.user, tag, state)
+        else:
+            quote_data = self.quote_service.get_random_quote(tag)
+        self.display_quote(quote_data)
+
+    def display_quote(self, quote_data: Optional[Quote]):
+        if quote_data:
+            self.current_quote = quote_data
+            self.quote_text.configure(state="normal")
+            self.quote_text.delete("1.0", "end")
+            self.quote_text.insert("1.0", f'"{quote_data.content}"\n\n- {quote_data.author}')
+            self.quote_text.configure(state="disabled")
+            self.storage_manager.add_to_history(quote_data)
+            self.update_history_display()
+        else:
+            self.show_error("Failed to fetch quote. Please try again.")
+
+    def add_to_favorites(self):
+        if self.current_quote:
+            self.storage_manager.add_favorite(self.current_quote)
+            self.update_favorites_display()
+            self.show_message("Success", "Quote added to favorites!")
+
+    def search_quotes(self, query: str):
+        self.search_cursor = self.quote_service.iter_search(query, mode="query")
+        self.search_results.configure(state="normal")
+        self.search_results.delete("1.0", "end")
+        self.search_results.configure(state="disabled")
+        if not self.load_more_results():
+            self.search_results.configure(state="normal")
+            self.search_results.insert("end", "No results found.")
+            self.search_results.configure(state="disabled")
+
+    def schedule_suggestions(self):
+        """Debounce keystrokes so suggestions refresh once typing pauses"""
+        if self.suggestion_job:
+            self.window.after_cancel(self.suggestion_job)
+        self.suggestion_job = self.window.after(120, self.update_suggestions)
+
+    def update_suggestions(self):
+        self.suggestion_job = None
+        for button in self.suggestions_frame.winfo_children():
+            button.destroy()
+        text = self.search_entry.get()
+        words = text.split()
+        if not words or text.endswith(" "):
+            return
+        head = text[:len(text) - len(words[-1])]
+        for suggestion in self.quote_service.complete(words[-1], limit=5, wait=False):
+            ctk.CTkButton(
+                self.suggestions_frame,
+                text=suggestion,
+                width=0,
+                command=lambda value=head + suggestion: self.apply_suggestion(value)
+            ).pack(side="left", padx=2, pady=2)
+
+    def apply_suggestion(self, value: str):
+        self.search_entry.delete(0, "end")
+        self.search_entry.insert(0, value)
+        self.update_suggestions()
+        self.search_quotes(value)
+
+    def load_more_results(self) -> int:
+        """Render the next page of the current search; returns how many were added"""
+        page = list(islice(self.search_cursor, self.SEARCH_PAGE_SIZE)) if self.search_cursor else []
+        self.search_results.configure(state="normal")
+        for quote in page:
+            self.search_results.insert("end", f'"{quote.content}"\n- {quote.author}\n\n')
+        self.search_results.configure(state="disabled")
+        has_more = len(page) == self.SEARCH_PAGE_SIZE
+        self.load_more_button.configure(state="normal" if has_more else "disabled")
+        return len(page)
+
+    def update_favorites_display(self):
+        favorites = self.storage_manager.get_favorites()
+        self.favorites_text.configure(state="normal")
+        self.favorites_text.delete("1.0", "end")
+        for quote in favorites:
+            self.favorites_text.insert("end", f'"{quote["content"]}"\n- {quote["author"]}\n\n')
+        self.favorites_text.configure(state="disabled")
+
+    def update_history_display(self):
+        history = self.storage_manager.get_history()
+        self.history_text.configure(state="normal")
+        self.history_text.delete("1.0", "end")
+        for quote in history:
+            viewed_at = datetime.fromisoformat(quote["viewed_at"]).strftime("%Y-%m-%d %H:%M")
+            self.history_text.insert("end", f'[{viewed_at}]\n"{quote["content"]}"\n- {quote["author"]}\n\n')
+        self.history_text.configure(state="disabled")
+
+    def export_favorites(self):
+        filepath = filedialog.asksaveasfilename(
+            defaultextension=".txt",
+            filetypes=[("Text files", "*.txt")],
+            title="Export Favorites"
+        )
+        if filepath:
+            self.storage_manager.export_favorites(filepath)
+            self.show_message("Success", "Favorites exported successfully!")
+
+    def show_error(self, message: str):
+        self.show_message("Error", message)
+
+    def show_message(self, title: str, message: str):
+        dialog = ctk.CTkToplevel(self.window)
+        dialog.title(title)
+        dialog.geometry("300x150")
+        
+        ctk.CTkLabel(dialog, text=message).pack(pady=20)
+        ctk.CTkButton(dialog, text="OK", command=dialog.destroy).pack(pady=10)
+    
+    def check_corpus_ready(self):
+        """Poll the background corpus load and refresh the categories once it finishes"""
+        if not self.quote_service.ready.is_set():
+            self.window.after(200, self.check_corpus_ready)
+            return
+        self.tags = [""] + self.quote_service.get_tags()
+        self.category_dropdown.configure(values=self.tags)
+        self.refresh_completer()
+        if self.quote_service.corpus_path is None:
+            # Started from quotes_database.py: compile it so the next launch maps it
+            threading.Thread(target=compile_builtin_corpus, daemon=True).start()
+
+    def refresh_completer(self):
+        """Keep the suggestion completer current: rebuild it in the background
+        whenever the corpus version has moved on"""
+        self.quote_service.warm_completer()
+        self.window.after(self.COMPLETER_POLL_MS, self.refresh_completer)
+
+    def run(self):
+        if self.quote_service.wait_until_ready(self.STARTUP_READY_TIMEOUT):
+            self.display_quote(self.quote_service.quote_of_the_day())
+        else:
+            self.update_quote()
+        self.check_corpus_ready()
+        self.window.mainloop()
+        
+    def cleanup(self):
+        self.notification_manager.stop_notifications()
+
+if __name__ == "__main__":
+    app = MotivationApp()
+    try:
+        app.run()
+    finally:
+        app.cleanup()
@@ -0,0 +1,46 @@
+"""Memory benchmark comparing the plain-dict corpus with Quote records and
+the columnar store.
+
+Usage: python benchmarks.py [quote_count]
+"""
+import sys
+import tracemalloc
+from typing import Callable, Dict, List
+
+from Main import ColumnarCorpus, Quote
+from quotes_database import QUOTES_DATABASE
+
+def synthetic_corpus(count: int) -> List[Dict]:
+    """Replicate QUOTES_DATABASE into `count` distinct dicts, as if parsed from a file"""
+    corpus = []
+    for i in range(count):
+        source = QUOTES_DATABASE[i % len(QUOTES_DATABASE)]
+        corpus.append({
+            "content": f'{source["content"]} #{i}',
+            "author": "".join(list(source["author"])),
+            "tags": ["".join(list(tag)) for tag in source["tags"]],
+            "_id": str(i + 1),
+        })
+    return corpus
+
+def measure(build: Callable[[], list]) -> int:
+    """Bytes still allocated by the structure `build` returns"""
+    tracemalloc.start()
+    data = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dict_bytes = measure(lambda: synthetic_corpus(count))
+    quote_bytes = measure(lambda: [Quote.from_dict(q) for q in synthetic_corpus(count)])
+    columnar_bytes = measure(lambda: ColumnarCorpus(Quote.from_dict(q) for q in synthetic_corpus(count)))
+    print(f"{count} quotes")
+    print(f"  dicts:  {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / count:.0f} B/quote)")
+    print(f"  Quote:  {quote_bytes / 2**20:8.1f} MiB ({quote_bytes / count:.0f} B/quote)")
+    print(f"  column: {columnar_bytes / 2**20:8.1f} MiB ({columnar_bytes / count:.0f} B/quote)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Compile a quote corpus into the binary format QuoteService can memory-map.
+
+Usage:
+    python compile_corpus.py OUTPUT [SOURCE]
+
+SOURCE is a .jsonl or .csv file; without it the built-in QUOTES_DATABASE is
+compiled. Load the result with QuoteService(corpus_path=OUTPUT).
+"""
+import sys
+
+from Main import compile_corpus, load_builtin_quotes, read_quote_source
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        sys.exit(1)
+    output = sys.argv[1]
+    quotes = read_quote_source(sys.argv[2]) if len(sys.argv) == 3 else load_builtin_quotes()
+    compile_corpus(quotes, output)
+    print(f"Compiled corpus written to {output}")
+
+if __name__ == "__main__":
+    main()